@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable
+
+# Gmail doesn't document a hard `q` limit; long queries start failing somewhere
+# past a few thousand characters, so stay well below that.
+MAX_QUERY_CHARS = 1500
+
+
+@dataclass(frozen=True)
+class SenderMatcher:
+    """Allowlist compiled once from config.
+
+    Patterns:
+    - `billing@vendor.com`  exact address
+    - `@vendor.com`, `*@vendor.com`, `vendor.com`  any address at that domain
+    - `*.vendor.com`, `@*.vendor.com`  any subdomain of vendor.com (and vendor.com itself)
+    """
+
+    addresses: frozenset[str] = frozenset()
+    domains: frozenset[str] = frozenset()
+    domain_suffixes: tuple[str, ...] = ()
+
+    @classmethod
+    def from_patterns(cls, patterns: Iterable[str]) -> SenderMatcher:
+        addresses: set[str] = set()
+        domains: set[str] = set()
+        suffixes: set[str] = set()
+        for raw in patterns:
+            p = raw.strip().lower()
+            if not p:
+                continue
+            local, at, domain = p.rpartition("@")
+            if at and local not in ("", "*"):
+                addresses.add(p)
+            elif domain.startswith("*."):
+                suffixes.add(domain[2:])
+            else:
+                domains.add(domain)
+        return cls(frozenset(addresses), frozenset(domains), tuple(sorted(suffixes)))
+
+    @property
+    def allows_all(self) -> bool:
+        return not (self.addresses or self.domains or self.domain_suffixes)
+
+    def matches(self, sender: str | None) -> bool:
+        if self.allows_all:
+            return True
+        if not sender:
+            return False
+        sender = sender.lower()
+        if sender in self.addresses:
+            return True
+        domain = sender.rpartition("@")[2]
+        if domain in self.domains:
+            return True
+        return any(domain == s or domain.endswith("." + s) for s in self.domain_suffixes)
+
+    def query_terms(self) -> list[str]:
+        """Terms for Gmail's `from:` operator; a domain term also matches its subdomains."""
+        return sorted(self.addresses) + sorted(self.domains | set(self.domain_suffixes))
+
+
+def from_queries(terms: list[str], *, max_chars: int = MAX_QUERY_CHARS) -> list[str]:
+    """Split `from:` terms into as few `from:(a OR b OR ...)` clauses as fit in `max_chars`."""
+    chunks: list[str] = []
+    current: list[str] = []
+    for term in terms:
+        candidate = current + [term]
+        if current and len(f"from:({' OR '.join(candidate)})") > max_chars:
+            chunks.append(f"from:({' OR '.join(current)})")
+            candidate = [term]
+        current = candidate
+    if current:
+        chunks.append(f"from:({' OR '.join(current)})")
+    return chunks
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .config import OcrSettings
+from .convert import convert_many, is_convertible
+from .extract import extract_fields_from_pdf
+from .ocr import ocr_pdf
+from .preprocess import apply_text_layer, pages_needing_ocr, preprocess_options, preprocess_pdf
+from .profiling import NullProfiler, Profiler
+
+
+@dataclass
+class BenchResult:
+    name: str
+    seconds: float
+    documents: int
+    ocr_pages: int = 0
+    ocr_seconds: float = 0.0
+    stages: dict[str, float] = field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def ocr_seconds_per_page(self) -> float | None:
+        return self.ocr_seconds / self.ocr_pages if self.ocr_pages else None
+
+
+def _is_pipeline_output(path: Path) -> bool:
+    # Skip files a previous run derived from an input (`x.ocr.pdf`, `x.prep.pdf`, `photo.jpg.pdf`).
+    if path.name.endswith((".ocr.pdf", ".prep.pdf")):
+        return True
+    return path.suffix == ".pdf" and path.with_suffix("").is_file()
+
+
+def case_name(path: Path) -> str:
+    return path.stem if path.is_file() else path.name
+
+
+def collect_inputs(path: Path) -> list[Path]:
+    """Files to replay for one bench case: a single file, or a saved message dir."""
+    if path.is_file():
+        return [path]
+    return sorted(
+        p
+        for p in path.iterdir()
+        if p.is_file() and not _is_pipeline_output(p) and (p.suffix.lower() == ".pdf" or is_convertible(p))
+    )
+
+
+def _ocr_case(
+    pdf: Path,
+    out_dir: Path,
+    preprocess: OcrSettings | None,
+    profiler: Profiler | NullProfiler,
+    errors: list[str],
+) -> tuple[Path, int, float]:
+    """OCR one document like the runner does; returns (final pdf, OCR'd pages, OCR seconds).
+
+    Failures are appended to `errors` instead of raised: preprocessing or text-layer
+    problems fall back to OCRing the original, and a failed OCR keeps the input.
+    Only the first OCR pass of a document is timed.
+    """
+
+    prepped = None
+    if preprocess is not None:
+        try:
+            with profiler.stage("preprocess"):
+                prepped = preprocess_pdf(
+                    in_path=pdf,
+                    out_path=out_dir / (pdf.stem + ".prep.pdf"),
+                    options=preprocess_options(preprocess),
+                    max_workers=preprocess.preprocess_workers,
+                )
+        except Exception as e:
+            errors.append(f"{pdf.name}: preprocess failed, OCR'd the original: {e}")
+
+    out_path = out_dir / (pdf.stem + ".ocr.pdf")
+    try:
+        if prepped is not None:
+            prep_ocr = out_dir / (pdf.stem + ".prep.ocr.pdf")
+            start = time.perf_counter()
+            with profiler.stage("ocr"):
+                ocr_pdf(in_path=prepped.path, out_path=prep_ocr)
+            seconds = time.perf_counter() - start
+            try:
+                with profiler.stage("text_layer"):
+                    final = apply_text_layer(original=pdf, ocred=prep_ocr, out_path=out_path, pages=prepped.pages)
+            except Exception as e:
+                errors.append(f"{pdf.name}: text layer failed, OCR'd the original: {e}")
+                with profiler.stage("ocr"):
+                    final = ocr_pdf(in_path=pdf, out_path=out_path)
+            return final, len(prepped.pages), seconds
+
+        start = time.perf_counter()
+        with profiler.stage("ocr"):
+            final = ocr_pdf(in_path=pdf, out_path=out_path)
+        seconds = time.perf_counter() - start
+        return final, len(pages_needing_ocr(pdf)), seconds
+    except Exception as e:
+        errors.append(f"{pdf.name}: {e}")
+        return pdf, 0, 0.0
+
+
+def run_case(
+    path: Path,
+    *,
+    workdir: Path,
+    ocr: bool = True,
+    preprocess: OcrSettings | None = None,
+    profiler: Profiler | NullProfiler | None = None,
+    name: str | None = None,
+) -> BenchResult:
+    """Run the local stages (convert, preprocess, OCR, extract) on one file or message dir.
+
+    Message dirs are what `run` leaves in its workdir (`<workdir>/<message_id>`),
+    so a slow message from a profile summary can be replayed offline. Pass
+    `preprocess=None` to OCR the original pages (the "before" of a comparison).
+    """
+
+    profiler = profiler or NullProfiler()
+    name = name or case_name(path)
+    out_dir = workdir / name
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    out_dir.mkdir(parents=True)
+
+    start = time.perf_counter()
+    with profiler.message(name, replay_dir=path) as prof:
+        inputs = collect_inputs(path)
+        pdfs = [p for p in inputs if p.suffix.lower() == ".pdf"]
+        with profiler.stage("convert"):
+            converted = convert_many([(p, None) for p in inputs if p.suffix.lower() != ".pdf"], out_dir=out_dir)
+        pdfs.extend(p for p in converted if p is not None)
+
+        errors: list[str] = []
+        ocr_pages = 0
+        ocr_seconds = 0.0
+        for pdf in pdfs:
+            final_pdf = pdf
+            if ocr:
+                final_pdf, pages, seconds = _ocr_case(pdf, out_dir, preprocess, profiler, errors)
+                ocr_pages += pages
+                ocr_seconds += seconds
+            try:
+                with profiler.stage("extract"):
+                    extract_fields_from_pdf(str(final_pdf))
+            except Exception as e:
+                errors.append(f"{pdf.name}: extract failed: {e}")
+
+    stages = dict(prof.stages) if prof is not None else {}
+    return BenchResult(
+        name=name,
+        seconds=time.perf_counter() - start,
+        documents=len(pdfs),
+        ocr_pages=ocr_pages,
+        ocr_seconds=ocr_seconds,
+        stages=stages,
+        error="; ".join(errors) or None,
+    )
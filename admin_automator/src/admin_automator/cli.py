@@ -5,9 +5,12 @@ from typing import Optional
 
 import typer
 
+from .bench import case_name, run_case
 from .config import load_settings
-from .google_auth import DEFAULT_TOKEN_PATH, get_credentials
-from .runner import DRIVE_SCOPES, GMAIL_SCOPES, SHEETS_SCOPES, run_once
+from .google_auth import DEFAULT_TOKEN_PATH, account_token_path, get_credential_manager, get_credentials
+from .ledger import export_parquet, find_duplicates, open_ledger, totals_by_vendor, vat_by_quarter
+from .profiling import Profiler, profile_dir
+from .runner import DRIVE_SCOPES, GMAIL_SCOPES, SHEETS_SCOPES, run_accounts, run_once
 
 app = typer.Typer(add_completion=False, help="Admin Automator")
 
@@ -15,31 +18,146 @@ app = typer.Typer(add_completion=False, help="Admin Automator")
 @app.command()
 def auth(
     credentials: Path = typer.Option(..., exists=True, help="Path to Google OAuth credentials.json"),
-    token: Path = typer.Option(DEFAULT_TOKEN_PATH, help="Where to store token.json"),
+    token: Optional[Path] = typer.Option(None, help="Where to store token.json"),
+    account: Optional[str] = typer.Option(None, help="Account name from config.yaml `accounts`"),
+    config: Optional[Path] = typer.Option(None, help="Path to config.yaml"),
 ):
     """Authenticate with Google and store a token file."""
+    if token is None:
+        token = DEFAULT_TOKEN_PATH
+        if account:
+            configured = next((a.token_path for a in load_settings(config).accounts if a.name == account), None)
+            token = account_token_path(account, configured)
     scopes = list({*GMAIL_SCOPES, *DRIVE_SCOPES, *SHEETS_SCOPES})
     get_credentials(scopes=scopes, credentials_path=credentials, token_path=token)
     typer.echo(f"Token saved to: {token}")
 
 
+def _echo_results(results, prefix: str = "") -> None:
+    for r in results:
+        status = "processed" if r.processed else "skipped"
+        reason = f" ({r.reason})" if r.reason else ""
+        typer.echo(f"{prefix}{r.message_id}: {status}{reason}")
+
+
 @app.command()
 def run(
     config: Optional[Path] = typer.Option(None, help="Path to config.yaml"),
     credentials: Optional[Path] = typer.Option(None, help="Path to Google OAuth credentials.json (first run only)"),
-    token: Path = typer.Option(DEFAULT_TOKEN_PATH, help="token.json path"),
+    token: Path = typer.Option(DEFAULT_TOKEN_PATH, help="token.json path (single-account configs)"),
     dry_run: bool = typer.Option(False, help="Don't modify Gmail/Drive/Sheets"),
+    profile: bool = typer.Option(False, help="Profile each message and stage; output goes to <workdir>/profile/"),
 ):
     """Process labeled Gmail messages."""
     settings = load_settings(config)
+    profiler = Profiler(profile_dir(Path(settings.processing.workdir))) if profile else None
+
+    try:
+        _run(settings, credentials=credentials, token=token, dry_run=dry_run, profiler=profiler)
+    finally:
+        if profiler is not None:
+            profiler.write()
+            typer.echo(profiler.format_summary())
+
+
+def _run(settings, *, credentials, token, dry_run, profiler) -> None:
+    if settings.accounts:
+        accounts = run_accounts(settings=settings, credentials_path=credentials, dry_run=dry_run, profiler=profiler)
+        for acc in accounts:
+            if acc.error:
+                typer.echo(f"[{acc.account}] failed: {acc.error}")
+                continue
+            processed = sum(1 for r in acc.results if r.processed)
+            typer.echo(f"[{acc.account}] {processed}/{len(acc.results)} processed")
+            _echo_results(acc.results, prefix=f"[{acc.account}] ")
+        return
+
     scopes = list({*GMAIL_SCOPES, *DRIVE_SCOPES, *SHEETS_SCOPES})
-    creds = get_credentials(scopes=scopes, credentials_path=credentials, token_path=token)
+    creds = get_credential_manager(scopes=scopes, credentials_path=credentials, token_path=token)
 
-    results = run_once(settings=settings, creds=creds, dry_run=dry_run)
-    for r in results:
-        status = "processed" if r.processed else "skipped"
-        reason = f" ({r.reason})" if r.reason else ""
-        typer.echo(f"{r.message_id}: {status}{reason}")
+    results = run_once(settings=settings, creds=creds, dry_run=dry_run, profiler=profiler)
+    _echo_results(results)
+
+
+@app.command()
+def bench(
+    paths: list[Path] = typer.Argument(..., exists=True, help="PDFs/images/office files, or saved message dirs"),
+    config: Optional[Path] = typer.Option(None, help="Path to config.yaml"),
+    ocr: bool = typer.Option(True, help="Run OCR (disable to time conversion/extraction only)"),
+    preprocess: Optional[bool] = typer.Option(None, help="Preprocess scanned pages before OCR (default: ocr.preprocess)"),
+    compare_preprocess: bool = typer.Option(False, help="Run each input with and without preprocessing"),
+    profile: bool = typer.Option(False, help="Profile each input and stage; output goes to <workdir>/profile/"),
+):
+    """Time the local pipeline (convert, OCR, extract) on saved inputs, without Google APIs."""
+    settings = load_settings(config)
+    workdir = Path(settings.processing.workdir)
+    profiler = Profiler(profile_dir(workdir)) if profile else None
+
+    use_preprocess = settings.ocr.preprocess if preprocess is None else preprocess
+    variants = [("", settings.ocr if use_preprocess else None)]
+    if compare_preprocess:
+        variants = [("before", None), ("after", settings.ocr)]
+
+    totals: dict[str, float] = {}
+    for path in paths:
+        for label, prep in variants:
+            r = run_case(
+                path,
+                workdir=workdir / "bench" / (label or "run"),
+                ocr=ocr,
+                preprocess=prep,
+                profiler=profiler,
+                name=f"{case_name(path)}-{label}" if label else None,
+            )
+            totals[label] = totals.get(label, 0.0) + r.seconds
+            stages = ", ".join(f"{k} {v:.2f}s" for k, v in r.stages.items())
+            per_page = f", OCR {r.ocr_seconds_per_page:.2f}s/page" if r.ocr_seconds_per_page is not None else ""
+            error = f" [{r.error}]" if r.error else ""
+            typer.echo(
+                f"{r.name}: {r.seconds:.2f}s, {r.documents} document(s){per_page}"
+                f"{f' ({stages})' if stages else ''}{error}"
+            )
+    for label, total in totals.items():
+        typer.echo(f"Total{f' ({label})' if label else ''}: {total:.2f}s for {len(paths)} input(s)")
+
+    if profiler is not None:
+        profiler.write()
+        typer.echo(profiler.format_summary())
+
+
+@app.command()
+def report(
+    kind: str = typer.Argument("vendors", help="vendors | vat | duplicates"),
+    config: Optional[Path] = typer.Option(None, help="Path to config.yaml"),
+    ledger: Optional[Path] = typer.Option(None, help="Ledger database (defaults to ledger.path from config)"),
+    account: Optional[str] = typer.Option(None, help="Only rows from this account (name from config.yaml `accounts`)"),
+    parquet: Optional[Path] = typer.Option(None, help="Also export the full ledger to this Parquet file"),
+):
+    """Run aggregate reports against the local ledger (no Sheets reads)."""
+    settings = load_settings(config)
+    path = ledger or Path(settings.ledger.path)
+    if not path.exists():
+        raise typer.BadParameter(f"No ledger at {path}; run `admin-automator run` first.")
+
+    conn = open_ledger(path)
+    try:
+        if kind == "vendors":
+            for r in totals_by_vendor(conn, account=account):
+                typer.echo(f"{r.key or '(unknown)'}\t{r.count}\t{r.amount}")
+        elif kind == "vat":
+            for r in vat_by_quarter(conn, account=account):
+                typer.echo(f"{r.key}\t{r.count}\t{r.amount}")
+        elif kind == "duplicates":
+            for d in find_duplicates(conn, account=account):
+                typer.echo(f"{d.invoice_date}\t{d.vendor}\t{d.total}\t{', '.join(d.message_ids)}")
+        else:
+            raise typer.BadParameter(f"Unknown report: {kind}")
+
+        if parquet:
+            export_parquet(conn, parquet)
+            typer.echo(f"Ledger exported to: {parquet}")
+    finally:
+        conn.close()
 
 
 if __name__ == "__main__":
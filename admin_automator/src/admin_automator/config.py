@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import yaml
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from pydantic import ConfigDict
 from pydantic_settings import BaseSettings
 
@@ -16,6 +16,9 @@ class GmailSettings(BaseModel):
 
 class DriveSettings(BaseModel):
     target_folder_name: str = "TA Admin 2026_Nelly"
+    # Resumable upload chunk size; progress is saved after each chunk.
+    upload_chunk_mb: int = 8
+    upload_workers: int = 2
 
 
 class SheetsSettings(BaseModel):
@@ -24,10 +27,55 @@ class SheetsSettings(BaseModel):
     todos_tab: str = "TODOs"
 
 
+class LedgerSettings(BaseModel):
+    # Local SQLite copy of every extracted row, for reporting without Sheets reads.
+    enabled: bool = True
+    path: str = ".admin_automator_work/ledger.sqlite3"
+
+
+class OcrSettings(BaseModel):
+    # Clean up scanned pages before OCR: tesseract time grows with pixel count. Only the
+    # text layer is kept; uploaded PDFs keep their original page images.
+    preprocess: bool = True
+    target_dpi: int = 300
+    binarize: bool = False
+    deskew: bool = True
+    auto_rotate: bool = True
+    preprocess_workers: int = 2
+
+
 class ProcessingSettings(BaseModel):
     dry_run: bool = False
     max_messages: int = 50
     workdir: str = ".admin_automator_work"
+    # Non-PDF attachments (images, office documents) are converted on a process pool
+    # shared by all messages; it has max(convert_workers, ocr.preprocess_workers) processes.
+    convert_workers: int = 2
+    # Downscale images to this longest side before PDF conversion (None keeps originals).
+    image_max_side_px: Optional[int] = 3508
+    # Messages run in priority order: fewest retries, sender priority, smallest, newest.
+    message_workers: int = 1
+    # Of those workers, at most this many may be busy with retries of failed messages.
+    retry_workers: int = 1
+    # Higher runs first; keys are addresses or "@domain".
+    sender_priority: Dict[str, int] = Field(default_factory=dict)
+    # OCR processes running at once, shared (fairly) by all accounts in one run.
+    ocr_workers: int = 2
+    max_parallel_accounts: int = 4
+    # Per-account Google API request budget; 0 disables throttling.
+    max_requests_per_second: float = 0
+
+
+class AccountSettings(BaseModel):
+    """One mailbox in a multi-account config; unset sections inherit the top-level ones."""
+
+    name: str
+    token_path: Optional[str] = None
+    allowlisted_senders: Optional[List[str]] = None
+    gmail: Optional[GmailSettings] = None
+    drive: Optional[DriveSettings] = None
+    sheets: Optional[SheetsSettings] = None
+    max_requests_per_second: Optional[float] = None
 
 
 class Settings(BaseSettings):
@@ -37,7 +85,47 @@ class Settings(BaseSettings):
     gmail: GmailSettings = Field(default_factory=GmailSettings)
     drive: DriveSettings = Field(default_factory=DriveSettings)
     sheets: Optional[SheetsSettings] = None
+    ledger: LedgerSettings = Field(default_factory=LedgerSettings)
+    ocr: OcrSettings = Field(default_factory=OcrSettings)
     processing: ProcessingSettings = Field(default_factory=ProcessingSettings)
+    accounts: List[AccountSettings] = Field(default_factory=list)
+
+    @field_validator("accounts")
+    @classmethod
+    def _unique_account_names(cls, accounts: List[AccountSettings]) -> List[AccountSettings]:
+        # Names key the per-account workdir, token file and ledger rows.
+        seen: set[str] = set()
+        for account in accounts:
+            if account.name in seen:
+                raise ValueError(f"duplicate account name: {account.name!r}")
+            seen.add(account.name)
+        return accounts
+
+
+def resolve_account(settings: Settings, account: AccountSettings) -> Settings:
+    """Settings for a single account: its overrides on top of the shared config."""
+    processing = settings.processing.model_copy(
+        update={
+            "workdir": str(Path(settings.processing.workdir) / account.name),
+            "max_requests_per_second": (
+                settings.processing.max_requests_per_second
+                if account.max_requests_per_second is None
+                else account.max_requests_per_second
+            ),
+        }
+    )
+    return settings.model_copy(
+        update={
+            "allowlisted_senders": (
+                settings.allowlisted_senders if account.allowlisted_senders is None else account.allowlisted_senders
+            ),
+            "gmail": account.gmail or settings.gmail,
+            "drive": account.drive or settings.drive,
+            "sheets": account.sheets or settings.sheets,
+            "processing": processing,
+            "accounts": [],
+        }
+    )
 
 
 def default_config_path() -> Path:
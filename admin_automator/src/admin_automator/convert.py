@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import fcntl
+import mimetypes
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Sequence
+
+
+class ConvertError(RuntimeError):
+    pass
+
+
+IMAGE_MIME_TYPES = {
+    "image/jpeg",
+    "image/png",
+    "image/tiff",
+    "image/gif",
+    "image/bmp",
+    "image/webp",
+}
+
+OFFICE_MIME_TYPES = {
+    "application/msword",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.ms-excel",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.ms-powerpoint",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "application/vnd.oasis.opendocument.text",
+    "application/vnd.oasis.opendocument.spreadsheet",
+    "application/rtf",
+    "text/rtf",
+}
+
+_SOFFICE_CANDIDATES = ["soffice", "libreoffice"]
+
+
+def guess_mime_type(path: Path, declared: str | None = None) -> str | None:
+    """Prefer the file extension; Gmail often reports `application/octet-stream`."""
+    mime, _ = mimetypes.guess_type(path.name)
+    if mime:
+        return mime
+    return declared
+
+
+def is_convertible(path: Path, declared: str | None = None) -> bool:
+    mime = guess_mime_type(path, declared)
+    return mime in IMAGE_MIME_TYPES or mime in OFFICE_MIME_TYPES
+
+
+def image_to_pdf(*, in_path: Path, out_path: Path, max_side_px: int | None = None) -> Path:
+    """Convert an image to a single-page PDF.
+
+    Images larger than `max_side_px` on their longest side are downscaled first;
+    OCR time grows with pixel count and phone photos are far above what tesseract needs.
+    Uses `img2pdf` (lossless, no re-encode) when installed, otherwise Pillow.
+    """
+
+    try:
+        from PIL import Image, ImageOps  # type: ignore
+    except ImportError as e:  # pragma: no cover - Pillow ships with pdfplumber
+        raise ConvertError("Pillow is required for image conversion") from e
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(in_path) as im:
+        dpi = float(im.info.get("dpi", (300, 300))[0] or 300)
+        # Apply EXIF orientation so photographed receipts are upright.
+        im = ImageOps.exif_transpose(im)
+        resized = bool(max_side_px) and max(im.size) > max_side_px
+        if resized:
+            before = max(im.size)
+            im.thumbnail((max_side_px, max_side_px), Image.Resampling.LANCZOS)
+            # Keep the physical page size: fewer pixels over the same inches.
+            dpi *= max(im.size) / before
+
+        if not resized:
+            try:
+                import img2pdf  # type: ignore
+
+                out_path.write_bytes(img2pdf.convert(str(in_path), rotation=img2pdf.Rotation.ifvalid))
+                return out_path
+            except ImportError:
+                pass
+            except Exception:
+                # e.g. alpha channels or exotic formats: fall back to Pillow
+                pass
+
+        if im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+        im.save(out_path, format="PDF", resolution=dpi)
+    return out_path
+
+
+def find_soffice() -> str | None:
+    for exe in _SOFFICE_CANDIDATES:
+        found = shutil.which(exe)
+        if found:
+            return found
+    return None
+
+
+@contextmanager
+def _soffice_profile() -> Iterator[Path]:
+    """Hold one of a few reusable LibreOffice profiles for the duration of a conversion.
+
+    Concurrent `soffice` instances sharing a profile block on its lock file instead
+    of running in parallel, so each conversion takes the first free slot (claimed
+    with an exclusive file lock, across threads and processes). Slots are reused
+    across runs, so only the first conversion in a slot pays profile setup.
+    """
+    base = Path(tempfile.gettempdir())
+    slot = 0
+    while True:
+        lock = open(base / f"admin-automator-soffice-{slot}.lock", "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            slot += 1
+            continue
+        try:
+            d = base / f"admin-automator-soffice-{slot}"
+            d.mkdir(parents=True, exist_ok=True)
+            yield d
+        finally:
+            lock.close()
+        return
+
+
+def office_to_pdf(*, in_path: Path, out_path: Path, timeout: int = 180) -> Path:
+    soffice = find_soffice()
+    if soffice is None:
+        raise ConvertError(
+            "LibreOffice not found. Install with e.g. `brew install --cask libreoffice` (macOS)."
+        )
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="admin-automator-convert-") as tmp, _soffice_profile() as profile:
+        cmd = [
+            soffice,
+            f"-env:UserInstallation={profile.as_uri()}",
+            "--headless",
+            "--norestore",
+            "--convert-to",
+            "pdf",
+            "--outdir",
+            tmp,
+            str(in_path),
+        ]
+        try:
+            p = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired as e:
+            raise ConvertError(f"LibreOffice timed out after {timeout}s") from e
+        produced = Path(tmp) / (in_path.stem + ".pdf")
+        if p.returncode != 0 or not produced.exists():
+            raise ConvertError(f"LibreOffice failed ({p.returncode}): {p.stderr.strip() or p.stdout.strip()}")
+        shutil.move(str(produced), out_path)
+    return out_path
+
+
+def convert_to_pdf(
+    *,
+    in_path: Path,
+    out_path: Path,
+    mime_type: str | None = None,
+    max_side_px: int | None = None,
+) -> Path:
+    mime = guess_mime_type(in_path, mime_type)
+    if mime in IMAGE_MIME_TYPES:
+        return image_to_pdf(in_path=in_path, out_path=out_path, max_side_px=max_side_px)
+    if mime in OFFICE_MIME_TYPES:
+        return office_to_pdf(in_path=in_path, out_path=out_path)
+    raise ConvertError(f"Unsupported attachment type: {mime or in_path.suffix or 'unknown'}")
+
+
+def _convert_job(job: tuple[Path, Path, str | None, int | None]) -> Path | None:
+    in_path, out_path, mime_type, max_side_px = job
+    try:
+        return convert_to_pdf(in_path=in_path, out_path=out_path, mime_type=mime_type, max_side_px=max_side_px)
+    except Exception:
+        return None
+
+
+def convert_many(
+    items: Sequence[tuple[Path, str | None]],
+    *,
+    out_dir: Path,
+    max_workers: int = 2,
+    max_side_px: int | None = None,
+    pool: Executor | None = None,
+) -> list[Path | None]:
+    """Convert `(path, mime_type)` items to PDFs on a bounded process pool.
+
+    Pass `pool` to share one process pool between concurrent callers; otherwise
+    one of `max_workers` is created for this call. Returns one entry per input,
+    in order; `None` where conversion failed.
+    """
+
+    jobs = [(p, out_dir / f"{p.name}.pdf", mime, max_side_px) for p, mime in items]
+    if not jobs:
+        return []
+    if pool is not None:
+        return list(pool.map(_convert_job, jobs))
+    if max_workers <= 1 or len(jobs) == 1:
+        return [_convert_job(j) for j in jobs]
+
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+        return list(pool.map(_convert_job, jobs))
@@ -1,14 +1,26 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
 from googleapiclient.discovery import Resource
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest, MediaFileUpload
+
+
+# Must be a multiple of 256 KiB.
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
 
 
 def find_folder_id_by_name(service: Resource, *, folder_name: str) -> str | None:
+    escaped = folder_name.replace("'", "\\'")
     q = (
         "mimeType='application/vnd.google-apps.folder' "
         "and trashed=false "
-        f"and name='{folder_name.replace("'", "\\'")}'"
+        f"and name='{escaped}'"
     )
     res = service.files().list(q=q, spaces="drive", fields="files(id,name)").execute()
     files = res.get("files", [])
@@ -30,8 +42,154 @@ def get_or_create_folder(service: Resource, *, folder_name: str) -> str:
     return create_folder(service, folder_name=folder_name)
 
 
-def upload_pdf(service: Resource, *, path: str, folder_id: str, filename: str) -> dict:
-    media = MediaFileUpload(path, mimetype="application/pdf", resumable=True)
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class UploadSessions:
+    """Resumable upload session URIs and offsets, persisted so uploads survive restarts.
+
+    A session is only resumed for the exact same bytes (size + sha256); anything
+    else starts a fresh upload.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            self._sessions: dict[str, dict] = json.loads(path.read_text())
+        except (FileNotFoundError, ValueError):
+            self._sessions = {}
+
+    @staticmethod
+    def key(*, path: str, folder_id: str, filename: str) -> str:
+        return f"{folder_id}/{filename}|{os.path.abspath(path)}"
+
+    def prune(self) -> None:
+        """Forget sessions whose file is gone or no longer has the bytes being uploaded."""
+        with self._lock:
+            saved = dict(self._sessions)
+        for key, entry in saved.items():
+            path = key.partition("|")[2]
+            if (
+                not os.path.isfile(path)
+                or entry.get("size") != os.path.getsize(path)
+                or entry.get("sha256") != _sha256(path)
+            ):
+                self.drop(key)
+
+    def has_pending(self, *, path: str, folder_id: str, filename: str) -> bool:
+        with self._lock:
+            return self.key(path=path, folder_id=folder_id, filename=filename) in self._sessions
+
+    def get(self, key: str, path: str) -> dict | None:
+        with self._lock:
+            saved = self._sessions.get(key)
+        if not saved:
+            return None
+        if saved.get("size") != os.path.getsize(path) or saved.get("sha256") != _sha256(path):
+            self.drop(key)
+            return None
+        return saved
+
+    def put(self, key: str, path: str, *, uri: str, offset: int) -> None:
+        with self._lock:
+            saved = self._sessions.get(key)
+            if saved is None or saved.get("uri") != uri:
+                saved = {"uri": uri, "size": os.path.getsize(path), "sha256": _sha256(path)}
+                self._sessions[key] = saved
+            saved["offset"] = offset
+            self._save()
+
+    def drop(self, key: str) -> None:
+        with self._lock:
+            if self._sessions.pop(key, None) is not None:
+                self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._sessions, indent=2, sort_keys=True))
+        os.replace(tmp, self.path)
+
+
+def _query_upload(request: HttpRequest, *, uri: str, size: int) -> tuple[int, dict | None]:
+    """Ask the server how much of a resumable upload it has received.
+
+    Returns `(offset, None)` while incomplete, or `(size, file)` if it already finished.
+    """
+    headers = {"Content-Range": f"bytes */{size}", "Content-Length": "0"}
+    resp, content = request.http.request(uri, "PUT", headers=headers)
+    if resp.status in (200, 201):
+        return size, request.postproc(resp, content)
+    if resp.status == 308:
+        received = resp.get("range")  # "bytes=0-<last byte>", absent if nothing arrived
+        return (int(received.rpartition("-")[2]) + 1 if received else 0), None
+    raise HttpError(resp, content, uri=uri)
+
+
+def upload_pdf(
+    service: Resource,
+    *,
+    path: str,
+    folder_id: str,
+    filename: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    sessions: UploadSessions | None = None,
+    num_retries: int = 3,
+) -> dict:
+    """Upload a PDF in `chunk_size` pieces.
+
+    With `sessions`, the resumable session URI and byte offset are saved after
+    every chunk, and an interrupted upload of the same file continues where the
+    server says it stopped instead of starting over.
+    """
+
+    media = MediaFileUpload(path, mimetype="application/pdf", chunksize=chunk_size, resumable=True)
     body = {"name": filename, "parents": [folder_id]}
-    created = service.files().create(body=body, media_body=media, fields="id,name,webViewLink").execute()
+    request = service.files().create(body=body, media_body=media, fields="id,name,webViewLink")
+
+    key = UploadSessions.key(path=path, folder_id=folder_id, filename=filename) if sessions else None
+    saved = sessions.get(key, path) if sessions else None
+    created = None
+    if saved:
+        try:
+            offset, created = _query_upload(request, uri=saved["uri"], size=os.path.getsize(path))
+        except HttpError as e:
+            if e.resp.status not in (404, 410):
+                raise
+            # The session expired (they last about a week): start over.
+            sessions.drop(key)
+            saved = None
+        else:
+            request.resumable_uri = saved["uri"]
+            request.resumable_progress = offset
+            media.stream().seek(offset)
+
+    while created is None:
+        try:
+            _, created = request.next_chunk(num_retries=num_retries)
+        except HttpError as e:
+            if saved and e.resp.status in (404, 410):
+                # The session expired (they last about a week): start over.
+                sessions.drop(key)
+                return upload_pdf(
+                    service,
+                    path=path,
+                    folder_id=folder_id,
+                    filename=filename,
+                    chunk_size=chunk_size,
+                    sessions=sessions,
+                    num_retries=num_retries,
+                )
+            raise
+        if sessions and created is None and request.resumable_uri:
+            sessions.put(key, path, uri=request.resumable_uri, offset=request.resumable_progress)
+
+    if sessions:
+        sessions.drop(key)
     return created
@@ -22,6 +22,37 @@ class GmailAttachment:
     data: bytes
 
 
+METADATA_HEADERS = ["From", "Subject", "Date"]
+
+
+@dataclass(slots=True)
+class GmailPart:
+    """Structure of one MIME part; attachment bytes are fetched on demand."""
+
+    mime_type: str
+    filename: str = ""
+    attachment_id: str | None = None
+    size: int = 0
+    # Inline base64url body; only kept for text/plain and text/html parts.
+    data: str | None = None
+
+
+@dataclass(slots=True)
+class GmailMessage:
+    """The fields of a Gmail message the pipeline uses; no raw payload is retained."""
+
+    id: str
+    thread_id: str | None = None
+    sender: str | None = None
+    subject: str | None = None
+    date: str | None = None
+    internal_date_ms: int = 0
+    size_estimate: int = 0
+    snippet: str = ""
+    # None until `load_message_parts` has fetched the MIME structure.
+    parts: list[GmailPart] | None = None
+
+
 def _header(headers: list[dict], name: str) -> str | None:
     for h in headers:
         if h.get("name", "").lower() == name.lower():
@@ -57,9 +88,10 @@ def list_messages_with_label(
     user_id: str,
     label_id: str,
     max_results: int = 50,
+    query: str | None = None,
 ) -> list[GmailMessageRef]:
     out: list[GmailMessageRef] = []
-    req = service.users().messages().list(userId=user_id, labelIds=[label_id], maxResults=max_results)
+    req = service.users().messages().list(userId=user_id, labelIds=[label_id], maxResults=max_results, q=query)
     while req is not None and len(out) < max_results:
         res = req.execute()
         for m in res.get("messages", []):
@@ -79,6 +111,64 @@ def get_message_full(service: Resource, *, user_id: str, message_id: str) -> dic
     )
 
 
+def get_message_metadata(service: Resource, *, user_id: str, message_id: str) -> dict:
+    return (
+        service.users()
+        .messages()
+        .get(userId=user_id, id=message_id, format="metadata", metadataHeaders=METADATA_HEADERS)
+        .execute()
+    )
+
+
+def parse_message(raw: dict) -> GmailMessage:
+    """Build a `GmailMessage` from a `format=metadata` (or `full`) response."""
+    return GmailMessage(
+        id=raw["id"],
+        thread_id=raw.get("threadId"),
+        sender=message_from_address(raw),
+        subject=message_subject(raw),
+        date=_header(raw.get("payload", {}).get("headers", []), "Date"),
+        internal_date_ms=int(raw.get("internalDate") or 0),
+        size_estimate=int(raw.get("sizeEstimate") or 0),
+        snippet=raw.get("snippet") or "",
+    )
+
+
+def get_message(service: Resource, *, user_id: str, message_id: str) -> GmailMessage:
+    """Fetch only the headers the pipeline needs; see `load_message_parts` for the body."""
+    return parse_message(get_message_metadata(service, user_id=user_id, message_id=message_id))
+
+
+def parse_parts(payload: dict) -> list[GmailPart]:
+    parts: list[GmailPart] = []
+    for part in _walk_parts(payload):
+        mime = (part.get("mimeType") or "").lower()
+        body = part.get("body") or {}
+        filename = part.get("filename") or ""
+        att_id = body.get("attachmentId")
+        is_attachment = bool(filename and att_id)
+        if not is_attachment and not (mime in ("text/plain", "text/html") and body.get("data")):
+            continue
+        parts.append(
+            GmailPart(
+                mime_type=mime,
+                filename=filename,
+                attachment_id=att_id,
+                size=int(body.get("size") or 0),
+                data=None if att_id else body.get("data"),
+            )
+        )
+    return parts
+
+
+def load_message_parts(service: Resource, *, user_id: str, message: GmailMessage) -> GmailMessage:
+    """Fetch the MIME structure once and keep only attachment refs and text bodies."""
+    if message.parts is None:
+        full = get_message_full(service, user_id=user_id, message_id=message.id)
+        message.parts = parse_parts(full.get("payload") or {})
+    return message
+
+
 def message_from_address(message_full: dict) -> str | None:
     headers = message_full.get("payload", {}).get("headers", [])
     raw_from = _header(headers, "From")
@@ -102,54 +192,44 @@ def _walk_parts(payload: dict) -> Iterable[dict]:
             stack.append(sub)
 
 
-def iter_attachments(service: Resource, *, user_id: str, message_full: dict) -> Iterable[GmailAttachment]:
-    payload = message_full.get("payload") or {}
-    for part in _walk_parts(payload):
-        filename = part.get("filename")
-        body = part.get("body") or {}
-        att_id = body.get("attachmentId")
-        mime_type = part.get("mimeType")
-
-        if filename and att_id:
+def iter_attachments(service: Resource, *, user_id: str, message: GmailMessage) -> Iterable[GmailAttachment]:
+    load_message_parts(service, user_id=user_id, message=message)
+    for part in message.parts or []:
+        if part.filename and part.attachment_id:
             att = (
                 service.users()
                 .messages()
                 .attachments()
-                .get(userId=user_id, messageId=message_full["id"], id=att_id)
+                .get(userId=user_id, messageId=message.id, id=part.attachment_id)
                 .execute()
             )
             data = base64.urlsafe_b64decode(att["data"].encode("utf-8"))
-            yield GmailAttachment(filename=filename, mime_type=mime_type, data=data)
+            yield GmailAttachment(filename=part.filename, mime_type=part.mime_type, data=data)
 
 
-def get_message_body_text(message_full: dict) -> str:
-    """Best-effort plain text extraction from the message payload."""
-    payload = message_full.get("payload") or {}
+def _decode_body(data: str) -> str:
+    return base64.urlsafe_b64decode(data.encode("utf-8")).decode("utf-8", errors="ignore")
 
-    # Prefer text/plain parts
-    plain: list[str] = []
-    html: list[str] = []
 
-    for part in _walk_parts(payload):
-        mime = (part.get("mimeType") or "").lower()
-        body = part.get("body") or {}
-        data = body.get("data")
-        if not data:
-            continue
-        decoded = base64.urlsafe_b64decode(data.encode("utf-8")).decode("utf-8", errors="ignore")
-        if mime == "text/plain":
-            plain.append(decoded)
-        elif mime == "text/html":
-            html.append(decoded)
+def get_message_body_text(message: GmailMessage) -> str:
+    """Best-effort plain text extraction from the message parts.
+
+    HTML parts are only decoded when the message has no text/plain part.
+    """
+
+    parts = [p for p in message.parts or [] if p.data and not p.attachment_id]
 
+    # Prefer text/plain parts
+    plain = [_decode_body(p.data) for p in parts if p.mime_type == "text/plain"]
     if plain:
         return "\n\n".join(plain).strip()
+
+    html = [_decode_body(p.data) for p in parts if p.mime_type == "text/html"]
     if html:
         # Return HTML as-is; caller can render
         return "\n\n".join(html).strip()
 
-    snippet = message_full.get("snippet")
-    return snippet or ""
+    return message.snippet or ""
 
 
 def is_html_body(text: str) -> bool:
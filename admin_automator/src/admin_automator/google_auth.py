@@ -1,16 +1,44 @@
 from __future__ import annotations
 
+import os
+import tempfile
+import threading
+import weakref
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Sequence
+from typing import Any, Sequence
 
+import httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
 
 
 DEFAULT_TOKEN_PATH = Path("~/.config/admin-automator/token.json").expanduser()
 
 
+def account_token_path(account_name: str, configured: str | None = None) -> Path:
+    if configured:
+        return Path(configured).expanduser()
+    return DEFAULT_TOKEN_PATH.with_name(f"token.{account_name}.json")
+
+
+def write_token(token_path: Path, creds: Credentials) -> None:
+    """Replace the token file atomically so a concurrent reader never sees a partial write."""
+    fd, tmp = tempfile.mkstemp(dir=token_path.parent, prefix=f".{token_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(creds.to_json())
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, token_path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
 def get_credentials(
     *,
     scopes: Sequence[str],
@@ -28,7 +56,7 @@ def get_credentials(
 
     if creds and creds.expired and creds.refresh_token:
         creds.refresh(Request())
-        token_path.write_text(creds.to_json())
+        write_token(token_path, creds)
         return creds
 
     if not credentials_path:
@@ -38,5 +66,107 @@ def get_credentials(
 
     flow = InstalledAppFlow.from_client_secrets_file(str(credentials_path), scopes=list(scopes))
     creds = flow.run_local_server(port=0)
-    token_path.write_text(creds.to_json())
+    write_token(token_path, creds)
     return creds
+
+
+# Refresh this long before the access token expires, so requests in flight
+# never race the expiry and trigger parallel refreshes on 401s.
+REFRESH_AHEAD = timedelta(minutes=5)
+
+
+class CredentialManager:
+    """One set of credentials shared by all API worker threads.
+
+    Refreshes happen under a lock (at most one per expiry, however many threads
+    notice) and are written back to the token file atomically. Each thread gets its
+    own `AuthorizedHttp` with a keep-alive httplib2 connection pool; sessions of
+    finished threads are reused by new ones instead of re-handshaking TLS.
+    """
+
+    def __init__(self, creds: Credentials, *, token_path: Path | None = None, timeout: float = 60):
+        self.credentials = creds
+        self.token_path = token_path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._idle: list[AuthorizedHttp] = []
+        self._idle_lock = threading.Lock()
+
+    def _needs_refresh(self) -> bool:
+        creds = self.credentials
+        if not creds.token:
+            return True
+        if creds.expiry is None:
+            return False
+        now = datetime.now(timezone.utc).replace(tzinfo=None)  # google-auth uses naive UTC
+        return creds.expiry - REFRESH_AHEAD <= now
+
+    def refresh(self, request: Any = None, *, stale_token: str | None = None) -> None:
+        """Refresh unless another thread already did.
+
+        With `stale_token`, refresh only if the current token is still that one
+        (i.e. the caller got a 401 and nobody has refreshed since).
+        """
+        with self._lock:
+            if stale_token is not None:
+                if self.credentials.token != stale_token:
+                    return
+            elif not self._needs_refresh():
+                return
+            self.credentials.refresh(request or Request())
+            if self.token_path is not None:
+                write_token(self.token_path, self.credentials)
+
+    def ensure_fresh(self, request: Any = None) -> None:
+        if self._needs_refresh():
+            self.refresh(request)
+
+    def authorized_http(self) -> AuthorizedHttp:
+        """The calling thread's authorized HTTP session (created or reused on first use)."""
+        session = getattr(self._local, "http", None)
+        if session is None:
+            with self._idle_lock:
+                session = self._idle.pop() if self._idle else None
+            if session is None:
+                session = AuthorizedHttp(_SharedCredentials(self), http=httplib2.Http(timeout=self.timeout))
+            self._local.http = session
+            # Hand the session back to the pool once this thread is gone.
+            weakref.finalize(threading.current_thread(), self._release, session)
+        return session
+
+    def _release(self, session: AuthorizedHttp) -> None:
+        with self._idle_lock:
+            self._idle.append(session)
+
+
+class _SharedCredentials:
+    """Credentials view handed to `AuthorizedHttp`; routes refreshes through the manager."""
+
+    def __init__(self, manager: CredentialManager):
+        self._manager = manager
+        # The token this thread's last request was sent with, i.e. the one a 401 rejected.
+        self._sent = threading.local()
+
+    def before_request(self, request: Any, method: str, url: str, headers: dict) -> None:
+        self._manager.ensure_fresh(request)
+        token = self._manager.credentials.token
+        self._manager.credentials.apply(headers, token=token)
+        self._sent.token = token
+
+    def refresh(self, request: Any) -> None:
+        self._manager.refresh(request, stale_token=getattr(self._sent, "token", None))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._manager.credentials, name)
+
+
+def get_credential_manager(
+    *,
+    scopes: Sequence[str],
+    credentials_path: Path | None = None,
+    token_path: Path = DEFAULT_TOKEN_PATH,
+) -> CredentialManager:
+    creds = get_credentials(scopes=scopes, credentials_path=credentials_path, token_path=token_path)
+    return CredentialManager(creds, token_path=token_path)
+
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from .extract import ExtractedFields
+
+
+class LedgerError(RuntimeError):
+    pass
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    account TEXT NOT NULL DEFAULT '',
+    message_id TEXT NOT NULL,
+    document TEXT NOT NULL,
+    invoice_date TEXT,
+    vendor TEXT,
+    total TEXT,
+    total_cents INTEGER,
+    vat_amount TEXT,
+    vat_cents INTEGER,
+    vat_numbers TEXT,
+    company_numbers TEXT,
+    drive_link TEXT,
+    subject TEXT,
+    sender TEXT,
+    app_version TEXT,
+    recorded_at TEXT NOT NULL,
+    PRIMARY KEY (account, message_id, document)
+);
+CREATE INDEX IF NOT EXISTS idx_invoices_vendor ON invoices (vendor);
+CREATE INDEX IF NOT EXISTS idx_invoices_invoice_date ON invoices (invoice_date);
+CREATE INDEX IF NOT EXISTS idx_invoices_message_id ON invoices (message_id);
+"""
+
+_COLUMNS = [
+    "account",
+    "message_id",
+    "document",
+    "invoice_date",
+    "vendor",
+    "total",
+    "total_cents",
+    "vat_amount",
+    "vat_cents",
+    "vat_numbers",
+    "company_numbers",
+    "drive_link",
+    "subject",
+    "sender",
+    "app_version",
+    "recorded_at",
+]
+
+
+@dataclass(frozen=True)
+class ReportRow:
+    key: str
+    count: int
+    amount: str
+
+
+@dataclass(frozen=True)
+class DuplicateRow:
+    vendor: str | None
+    invoice_date: str | None
+    total: str | None
+    message_ids: list[str]
+
+
+def _to_cents(amount: str | None) -> int | None:
+    if not amount:
+        return None
+    try:
+        return int((Decimal(amount) * 100).to_integral_value())
+    except InvalidOperation:
+        return None
+
+
+def _from_cents(cents: int | None) -> str:
+    return str((Decimal(cents or 0) / 100).quantize(Decimal("0.01")))
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    # Ledgers written before multi-account runs have no `account` column; it is
+    # part of the primary key, so the table is rebuilt rather than altered.
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(invoices)")]
+    if not columns or "account" in columns:
+        return
+    with conn:
+        conn.execute("ALTER TABLE invoices RENAME TO invoices_old")
+        conn.executescript(_SCHEMA)
+        conn.execute(
+            f"INSERT INTO invoices ({', '.join(columns)}) SELECT {', '.join(columns)} FROM invoices_old"
+        )
+        conn.execute("DROP TABLE invoices_old")
+
+
+def open_ledger(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Callers serialise writes themselves; worker threads share one connection.
+    conn = sqlite3.connect(str(path), check_same_thread=False)
+    _migrate(conn)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _account_filter(account: str | None, *, where: bool) -> tuple[str, list[str]]:
+    if account is None:
+        return "", []
+    return (" WHERE" if where else " AND") + " account = ?", [account]
+
+
+def record_invoice(
+    conn: sqlite3.Connection,
+    *,
+    fields: ExtractedFields,
+    message_id: str,
+    document: str,
+    account: str = "",
+    drive_link: str | None = None,
+    subject: str | None = None,
+    sender: str | None = None,
+    app_version: str | None = None,
+) -> None:
+    """Insert or replace the ledger row for one uploaded document of a message.
+
+    `account` is the mailbox name from `accounts` ("" for single-account configs).
+    """
+    values = [
+        account,
+        message_id,
+        document,
+        fields.invoice_date,
+        fields.vendor,
+        fields.total,
+        _to_cents(fields.total),
+        fields.vat_amount,
+        _to_cents(fields.vat_amount),
+        "; ".join(fields.vat_numbers or []),
+        "; ".join(fields.company_numbers or []),
+        drive_link,
+        subject,
+        sender,
+        app_version,
+        datetime.now().isoformat(timespec="seconds"),
+    ]
+    with conn:
+        conn.execute(
+            f"INSERT OR REPLACE INTO invoices ({', '.join(_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+            values,
+        )
+
+
+def totals_by_vendor(conn: sqlite3.Connection, *, account: str | None = None) -> list[ReportRow]:
+    where, params = _account_filter(account, where=True)
+    rows = conn.execute(
+        "SELECT COALESCE(vendor, ''), COUNT(*), SUM(total_cents) FROM invoices"
+        f"{where} GROUP BY vendor ORDER BY SUM(total_cents) DESC",
+        params,
+    ).fetchall()
+    return [ReportRow(key=k, count=n, amount=_from_cents(c)) for k, n, c in rows]
+
+
+def vat_by_quarter(conn: sqlite3.Connection, *, account: str | None = None) -> list[ReportRow]:
+    where, params = _account_filter(account, where=False)
+    rows = conn.execute(
+        "SELECT substr(invoice_date, 1, 4) || '-Q' || ((CAST(substr(invoice_date, 6, 2) AS INTEGER) + 2) / 3) AS q, "
+        "COUNT(*), SUM(vat_cents) FROM invoices "
+        f"WHERE invoice_date IS NOT NULL{where} GROUP BY q ORDER BY q",
+        params,
+    ).fetchall()
+    return [ReportRow(key=k, count=n, amount=_from_cents(c)) for k, n, c in rows]
+
+
+def find_duplicates(conn: sqlite3.Connection, *, account: str | None = None) -> list[DuplicateRow]:
+    """Invoices with the same vendor, date and total that arrived in different messages.
+
+    Without `account` this also catches the same invoice sent to two mailboxes.
+    """
+    where, params = _account_filter(account, where=False)
+    rows = conn.execute(
+        "SELECT vendor, invoice_date, total, group_concat(DISTINCT message_id) FROM invoices "
+        f"WHERE total_cents IS NOT NULL{where} "
+        "GROUP BY vendor, invoice_date, total_cents "
+        "HAVING COUNT(DISTINCT message_id) > 1 "
+        "ORDER BY invoice_date",
+        params,
+    ).fetchall()
+    return [
+        DuplicateRow(vendor=v, invoice_date=d, total=t, message_ids=sorted(ids.split(",")))
+        for v, d, t, ids in rows
+    ]
+
+
+def export_parquet(conn: sqlite3.Connection, out_path: Path) -> Path:
+    """Write the whole ledger to a Parquet file (requires optional dependency `pyarrow`)."""
+    try:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+    except ImportError as e:
+        raise LedgerError("Parquet export requires `pip install admin-automator[parquet]`") from e
+
+    cur = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM invoices ORDER BY account, invoice_date, message_id")
+    rows = cur.fetchall()
+    table = pa.table({col: [r[i] for r in rows] for i, col in enumerate(_COLUMNS)})
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, str(out_path))
+    return out_path
@@ -23,11 +23,11 @@ def ocr_pdf(*, in_path: Path, out_path: Path, language: str = "eng") -> Path:
     ensure_ocr_dependencies()
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # --skip-text means: if the PDF already has text, don't OCR it again.
+    # --skip-text means: if a page already has text, don't OCR it again.
+    # (ocrmypdf rejects it combined with --force-ocr.)
     cmd = [
         "ocrmypdf",
         "--skip-text",
-        "--force-ocr",
         "--output-type",
         "pdf",
         "-l",
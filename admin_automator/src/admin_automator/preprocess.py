@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Mapping
+
+import pypdfium2 as pdfium
+from PIL import Image, ImageOps
+
+from .config import OcrSettings
+
+
+@dataclass(frozen=True)
+class PreprocessOptions:
+    target_dpi: int = 300
+    binarize: bool = False
+    deskew: bool = True
+    auto_rotate: bool = True
+    max_skew_degrees: float = 5.0
+    jpeg_quality: int = 85
+
+
+@dataclass(frozen=True)
+class PageTransform:
+    """How a preprocessed page was turned relative to the original (as displayed)."""
+
+    skew_degrees: float = 0.0  # counter-clockwise deskew rotation
+    rotate: int = 0  # clockwise quarter turns from orientation detection, in degrees
+
+
+@dataclass
+class PreprocessedPdf:
+    path: Path
+    # Only the rasterized (scanned) pages, by index.
+    pages: dict[int, PageTransform] = field(default_factory=dict)
+
+
+def preprocess_options(settings: OcrSettings) -> PreprocessOptions:
+    return PreprocessOptions(
+        target_dpi=settings.target_dpi,
+        binarize=settings.binarize,
+        deskew=settings.deskew,
+        auto_rotate=settings.auto_rotate,
+    )
+
+
+def pages_needing_ocr(path: Path) -> list[int]:
+    """Indexes of pages without a text layer (i.e. scanned pages)."""
+    pdf = pdfium.PdfDocument(str(path))
+    try:
+        out = []
+        for i in range(len(pdf)):
+            page = pdf[i]
+            if page.get_textpage().count_chars() == 0:
+                out.append(i)
+        return out
+    finally:
+        pdf.close()
+
+
+def _render_dpi(page: pdfium.PdfPage, target_dpi: int) -> float:
+    """Render at the target DPI, but never above the resolution of the embedded scan."""
+    width_pt = page.get_width()
+    best = 0.0
+    for obj in page.get_objects(filter=[pdfium.raw.FPDF_PAGEOBJ_IMAGE]):
+        px_w, _ = obj.get_px_size()
+        left, _, right, _ = obj.get_bounds()
+        if right > left:
+            best = max(best, px_w / ((right - left) / 72))
+    if best <= 0 or width_pt <= 0:
+        return float(target_dpi)
+    return float(min(target_dpi, best))
+
+
+def otsu_threshold(gray: Image.Image) -> int:
+    hist = gray.histogram()[:256]
+    total = sum(hist)
+    sum_all = sum(i * h for i, h in enumerate(hist))
+    sum_bg = 0.0
+    weight_bg = 0
+    best_t, best_var = 127, -1.0
+    for t in range(256):
+        weight_bg += hist[t]
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * hist[t]
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best_var:
+            best_t, best_var = t, between
+    return best_t
+
+
+def _row_profile_score(ink: Image.Image) -> float:
+    # Squash to one column: each pixel is the mean ink of a row. Text lines aligned
+    # with the rows give sharp peaks/valleys, i.e. high variance.
+    rows = ink.resize((1, ink.height), Image.Resampling.BOX).tobytes()
+    mean = sum(rows) / len(rows)
+    return sum((r - mean) ** 2 for r in rows)
+
+
+def estimate_skew(gray: Image.Image, *, max_degrees: float = 5.0, step: float = 0.25) -> float:
+    """Angle (degrees, counter-clockwise) that makes text lines horizontal."""
+    small = gray.copy()
+    small.thumbnail((800, 800))
+    ink = ImageOps.invert(small)
+
+    def score(angle: float) -> float:
+        return _row_profile_score(ink.rotate(angle, resample=Image.Resampling.NEAREST, fillcolor=0))
+
+    # coarse pass, then refine around the best coarse angle
+    coarse = [a / 2 for a in range(int(-max_degrees * 2), int(max_degrees * 2) + 1)]
+    best = max(coarse, key=score)
+    fine = [best + k * step for k in range(-2, 3)]
+    return max(fine, key=score)
+
+
+def detect_rotation(image_path: Path) -> int:
+    """Clockwise rotation tesseract's orientation detection suggests (0/90/180/270)."""
+    if shutil.which("tesseract") is None:
+        return 0
+    p = subprocess.run(
+        ["tesseract", str(image_path), "-", "--psm", "0"],
+        capture_output=True,
+        text=True,
+    )
+    m = re.search(r"Rotate:\s*(\d+)", p.stdout + p.stderr)
+    return int(m.group(1)) % 360 if (p.returncode == 0 and m) else 0
+
+
+def preprocess_image(im: Image.Image, options: PreprocessOptions) -> tuple[Image.Image, float]:
+    """Grayscale, deskewed and optionally binarized copy of `im`, and the deskew angle applied."""
+    gray = ImageOps.grayscale(im)
+    angle = 0.0
+    if options.deskew:
+        angle = estimate_skew(gray, max_degrees=options.max_skew_degrees)
+        if abs(angle) >= 0.1:
+            gray = gray.rotate(angle, resample=Image.Resampling.BICUBIC, fillcolor=255)
+        else:
+            angle = 0.0
+    if options.binarize:
+        t = otsu_threshold(gray)
+        gray = gray.point(lambda v: 255 if v > t else 0)
+    return gray, angle
+
+
+def _preprocess_page(
+    job: tuple[Path, int, Path, PreprocessOptions],
+) -> tuple[int, Path, float, float, PageTransform]:
+    pdf_path, index, out_dir, options = job
+    pdf = pdfium.PdfDocument(str(pdf_path))
+    try:
+        page = pdf[index]
+        dpi = _render_dpi(page, options.target_dpi)
+        im = page.render(scale=dpi / 72).to_pil()
+    finally:
+        pdf.close()
+
+    im, angle = preprocess_image(im, options)
+    out = out_dir / f"page-{index:04d}.jpg"
+    im.save(out, format="JPEG", quality=options.jpeg_quality, dpi=(dpi, dpi))
+
+    rotate = detect_rotation(out) if options.auto_rotate else 0
+    if rotate:
+        im = im.rotate(-rotate, expand=True)
+        im.save(out, format="JPEG", quality=options.jpeg_quality, dpi=(dpi, dpi))
+
+    transform = PageTransform(skew_degrees=angle, rotate=rotate)
+    return index, out, im.width * 72 / dpi, im.height * 72 / dpi, transform
+
+
+def preprocess_pdf(
+    *,
+    in_path: Path,
+    out_path: Path,
+    options: PreprocessOptions | None = None,
+    max_workers: int = 2,
+    pool: Executor | None = None,
+) -> PreprocessedPdf | None:
+    """Build a copy of `in_path` with its scanned pages cleaned up for OCR.
+
+    Only pages without a text layer are rasterized (at most `target_dpi`, in
+    grayscale, optionally binarized, deskewed and auto-rotated) on a process pool;
+    pages with text are copied unchanged. Pass `pool` to use a shared process
+    pool instead of one of `max_workers`. Returns None if no page needs OCR.
+
+    The copy is only meant for tesseract: OCR it, then put its text layer back on
+    the original pages with `apply_text_layer`.
+    """
+
+    options = options or PreprocessOptions()
+    scanned = pages_needing_ocr(in_path)
+    if not scanned:
+        return None
+
+    with tempfile.TemporaryDirectory(prefix="admin-automator-preprocess-") as tmp:
+        jobs = [(in_path, i, Path(tmp), options) for i in scanned]
+        if pool is not None:
+            pages = list(pool.map(_preprocess_page, jobs))
+        elif max_workers <= 1 or len(jobs) == 1:
+            pages = [_preprocess_page(j) for j in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+                pages = list(pool.map(_preprocess_page, jobs))
+        images = {index: (path, w, h) for index, path, w, h, _ in pages}
+
+        src = pdfium.PdfDocument(str(in_path))
+        dst = pdfium.PdfDocument.new()
+        try:
+            for i in range(len(src)):
+                if i not in images:
+                    dst.import_pages(src, pages=[i])
+                    continue
+                path, w, h = images[i]
+                page = dst.new_page(w, h)
+                img = pdfium.PdfImage.new(dst)
+                img.load_jpeg(str(path), inline=True)
+                img.set_matrix(pdfium.PdfMatrix().scale(w, h))
+                page.insert_obj(img)
+                page.gen_content()
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            dst.save(str(out_path))
+        finally:
+            dst.close()
+            src.close()
+    return PreprocessedPdf(path=out_path, pages={index: t for index, _, _, _, t in pages})
+
+
+def _turn_back(width: float, height: float, degrees_cw: int) -> pdfium.PdfMatrix:
+    """Map a `width` x `height` box that was turned `degrees_cw` clockwise back upright."""
+    turn = degrees_cw % 360
+    shift = {0: (0, 0), 90: (height, 0), 180: (width, height), 270: (0, width)}[turn]
+    return pdfium.PdfMatrix().rotate(turn, ccw=True).translate(*shift)
+
+
+def _text_layer_matrix(text_page: pdfium.PdfPage, page: pdfium.PdfPage, t: PageTransform) -> pdfium.PdfMatrix:
+    w, h = text_page.get_width(), text_page.get_height()
+    # Size of the original page as displayed, i.e. as it was rendered for preprocessing.
+    width, height = page.get_width(), page.get_height()
+
+    m = _turn_back(w, h, t.rotate)
+    turned_w, turned_h = (h, w) if t.rotate % 180 else (w, h)
+    m = m.scale(width / turned_w, height / turned_h)
+    if t.skew_degrees:
+        m = m.translate(-width / 2, -height / 2).rotate(t.skew_degrees).translate(width / 2, height / 2)
+    # The page's own /Rotate turns its content clockwise for display; undo that too.
+    m = m.multiply(_turn_back(width, height, page.get_rotation()))
+    left, bottom, _, _ = page.get_cropbox()
+    return m.translate(left, bottom)
+
+
+def apply_text_layer(
+    *,
+    original: Path,
+    ocred: Path,
+    out_path: Path,
+    pages: Mapping[int, PageTransform],
+) -> Path:
+    """Copy the OCR text of `ocred` (an OCR'd `preprocess_pdf` copy) onto `original`.
+
+    The result keeps the original page images; each page in `pages` only gains the
+    invisible text layer, mapped back through that page's auto-rotation and deskew.
+    """
+
+    src = pdfium.PdfDocument(str(ocred))
+    dst = pdfium.PdfDocument(str(original))
+    try:
+        for i, t in sorted(pages.items()):
+            text_page = src[i]
+            for obj in list(text_page.get_objects(max_depth=1)):
+                if obj.type == pdfium.raw.FPDF_PAGEOBJ_IMAGE:
+                    text_page.remove_obj(obj)
+            text_page.gen_content()
+
+            page = dst[i]
+            layer = src.page_as_xobject(i, dst).as_pageobject()
+            layer.set_matrix(_text_layer_matrix(text_page, page, t))
+            page.insert_obj(layer)
+            page.gen_content()
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        dst.save(str(out_path))
+    finally:
+        dst.close()
+        src.close()
+    return out_path
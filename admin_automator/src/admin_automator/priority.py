@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Mapping
+
+from .gmail_client import GmailMessage
+
+
+# sizeEstimate tiers: small mails (typical PDF invoices) before big multi-page scans.
+_SIZE_TIERS = [1 << 20, 5 << 20, 20 << 20]
+
+
+def size_tier(size_estimate: int) -> int:
+    for i, limit in enumerate(_SIZE_TIERS):
+        if size_estimate <= limit:
+            return i
+    return len(_SIZE_TIERS)
+
+
+def sender_priority(sender: str | None, priorities: Mapping[str, int]) -> int:
+    """Look up a sender's configured priority by full address, then by domain."""
+    if not sender or not priorities:
+        return 0
+    sender = sender.lower()
+    if sender in priorities:
+        return priorities[sender]
+    domain = sender.rpartition("@")[2]
+    return priorities.get(f"@{domain}", priorities.get(domain, 0))
+
+
+@dataclass(order=True)
+class WorkItem:
+    """A message queued for processing; lower `sort_key` runs first."""
+
+    sort_key: tuple[int, int, int, int]
+    message: GmailMessage = field(compare=False)
+    retries: int = field(default=0, compare=False)
+
+    @property
+    def is_retry(self) -> bool:
+        return self.retries > 0
+
+
+def make_work_item(message: GmailMessage, *, retries: int = 0, priorities: Mapping[str, int] | None = None) -> WorkItem:
+    key = (
+        retries,
+        -sender_priority(message.sender, priorities or {}),
+        size_tier(message.size_estimate),
+        -message.internal_date_ms,  # newest first
+    )
+    return WorkItem(sort_key=key, message=message, retries=retries)
+
+
+class RetryLog:
+    """Per-message failure counts, persisted as JSON in the workdir between runs."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            self._counts: dict[str, int] = json.loads(path.read_text())
+        except (FileNotFoundError, ValueError):
+            self._counts = {}
+
+    def get(self, message_id: str) -> int:
+        with self._lock:
+            return self._counts.get(message_id, 0)
+
+    def record_failure(self, message_id: str) -> None:
+        with self._lock:
+            self._counts[message_id] = self._counts.get(message_id, 0) + 1
+
+    def clear(self, message_id: str) -> None:
+        with self._lock:
+            self._counts.pop(message_id, None)
+
+    def save(self) -> None:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._counts, indent=2, sort_keys=True))
+            os.replace(tmp, self.path)
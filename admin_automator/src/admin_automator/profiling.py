@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import cProfile
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import ContextManager, Iterator
+
+
+@dataclass
+class MessageProfile:
+    message_id: str
+    seconds: float = 0.0
+    stages: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    replay_dir: str | None = None
+    profile_path: str | None = None
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off; every hook is a no-op."""
+
+    def message(self, message_id: str, *, replay_dir: Path | None = None) -> ContextManager:
+        return nullcontext()
+
+    def stage(self, name: str) -> ContextManager:
+        return nullcontext()
+
+
+class Profiler:
+    """Per-message, per-stage profiling for `run --profile` and `bench --profile`.
+
+    For each message this records wall time per stage (subprocesses such as
+    ocrmypdf included, since they're timed from the outside) and a CPU profile of
+    the Python side: pyinstrument (sampling, written as speedscope JSON) when
+    installed, cProfile (`.prof`, for snakeviz/flameprof) otherwise.
+
+    `write()` adds `stages.folded` (collapsed stacks: `message;stage microseconds`,
+    for flamegraph.pl or speedscope) and `summary.json` with the slowest messages.
+    """
+
+    def __init__(self, out_dir: Path, *, top_n: int = 10):
+        self.out_dir = out_dir
+        self.top_n = top_n
+        self.messages: dict[str, MessageProfile] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        (self.out_dir / "messages").mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def message(self, message_id: str, *, replay_dir: Path | None = None) -> Iterator[MessageProfile]:
+        prof = MessageProfile(message_id=message_id, replay_dir=str(replay_dir) if replay_dir else None)
+        with self._lock:
+            self.messages[message_id] = prof
+        self._local.current = prof
+
+        sampler = self._start_sampler()
+        start = time.perf_counter()
+        try:
+            yield prof
+        finally:
+            prof.seconds = time.perf_counter() - start
+            prof.profile_path = self._stop_sampler(sampler, message_id)
+            self._local.current = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        prof: MessageProfile | None = getattr(self._local, "current", None)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if prof is not None:
+                prof.stages[name] += time.perf_counter() - start
+
+    def _start_sampler(self):
+        try:
+            from pyinstrument import Profiler as SamplingProfiler  # type: ignore
+
+            sampler = SamplingProfiler(async_mode="disabled")
+            sampler.start()
+            return sampler
+        except ImportError:
+            pass
+        except RuntimeError:
+            # Another sampler is already running in this thread.
+            return None
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per interpreter; with
+            # concurrent message workers the others fall back to stage timings.
+            return None
+        return profile
+
+    def _stop_sampler(self, sampler, message_id: str) -> str | None:
+        if sampler is None:
+            return None
+        safe_id = message_id.replace("/", "_")
+        if isinstance(sampler, cProfile.Profile):
+            sampler.disable()
+            path = self.out_dir / "messages" / f"{safe_id}.prof"
+            sampler.dump_stats(str(path))
+            return str(path)
+
+        from pyinstrument.renderers import SpeedscopeRenderer  # type: ignore
+
+        sampler.stop()
+        path = self.out_dir / "messages" / f"{safe_id}.speedscope.json"
+        path.write_text(sampler.output(renderer=SpeedscopeRenderer()))
+        return str(path)
+
+    def slowest(self) -> list[MessageProfile]:
+        return sorted(self.messages.values(), key=lambda p: p.seconds, reverse=True)[: self.top_n]
+
+    def write(self) -> Path:
+        folded = self.out_dir / "stages.folded"
+        with folded.open("w") as f:
+            for prof in self.messages.values():
+                for stage, seconds in sorted(prof.stages.items()):
+                    f.write(f"{prof.message_id};{stage} {int(seconds * 1_000_000)}\n")
+
+        summary = {
+            "messages": len(self.messages),
+            "total_seconds": round(sum(p.seconds for p in self.messages.values()), 3),
+            "slowest": [
+                {
+                    "message_id": p.message_id,
+                    "seconds": round(p.seconds, 3),
+                    "stages": {k: round(v, 3) for k, v in sorted(p.stages.items(), key=lambda kv: -kv[1])},
+                    "replay_dir": p.replay_dir,
+                    "profile": p.profile_path,
+                }
+                for p in self.slowest()
+            ],
+        }
+        path = self.out_dir / "summary.json"
+        path.write_text(json.dumps(summary, indent=2))
+        return path
+
+    def format_summary(self) -> str:
+        lines = [f"Slowest {min(self.top_n, len(self.messages))} of {len(self.messages)} messages:"]
+        for p in self.slowest():
+            top = ", ".join(f"{k} {v:.2f}s" for k, v in sorted(p.stages.items(), key=lambda kv: -kv[1])[:3])
+            lines.append(f"  {p.message_id}: {p.seconds:.2f}s ({top})")
+        lines.append(f"Profile written to: {self.out_dir}")
+        return "\n".join(lines)
+
+
+def profile_dir(workdir: Path) -> Path:
+    return workdir / "profile" / time.strftime("%Y%m%d-%H%M%S")
@@ -1,28 +1,43 @@
 from __future__ import annotations
 
+import heapq
 import mimetypes
 import re
-from dataclasses import dataclass
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
+from typing import Callable, ContextManager, Iterator
 
 from googleapiclient.discovery import build
 
 from . import __version__
-from .config import Settings
-from .drive_client import get_or_create_folder, upload_pdf
+from .allowlist import SenderMatcher, from_queries
+from .config import AccountSettings, Settings, resolve_account
+from .convert import convert_many, is_convertible
+from .drive_client import UploadSessions, get_or_create_folder, upload_pdf
 from .extract import extract_fields_from_pdf
 from .gmail_client import (
+    GmailMessage,
+    GmailMessageRef,
+    get_message,
     get_message_body_text,
-    get_message_full,
     get_or_create_label,
     iter_attachments,
-    message_from_address,
-    message_subject,
+    list_messages_with_label,
     modify_labels,
     save_attachment,
 )
-from .ocr import ocr_pdf
+from .google_auth import CredentialManager, account_token_path, get_credential_manager
+from .ledger import open_ledger, record_invoice
+from .ocr import ensure_ocr_dependencies, ocr_pdf
 from .pdf_render import render_email_to_pdf
+from .preprocess import apply_text_layer, preprocess_options, preprocess_pdf
+from .priority import RetryLog, WorkItem, make_work_item
+from .profiling import NullProfiler, Profiler
+from .throttle import FairSlots, RateLimiter, ThrottledHttp
 
 
 GMAIL_SCOPES = ["https://www.googleapis.com/auth/gmail.modify"]
@@ -43,12 +58,135 @@ def _safe_filename(name: str) -> str:
     return name[:180] if len(name) > 180 else name
 
 
-def run_once(*, settings: Settings, creds, dry_run: bool | None = None) -> list[ProcessResult]:
+@dataclass
+class AccountResult:
+    account: str
+    results: list[ProcessResult] = field(default_factory=list)
+    error: str | None = None
+
+
+def _build_service(name: str, version: str, *, creds: CredentialManager, limiter: RateLimiter | None = None):
+    http = creds.authorized_http()
+    if limiter is not None:
+        http = ThrottledHttp(http, limiter)
+    return build(name, version, http=http)
+
+
+def _process_pool(settings: Settings) -> ProcessPoolExecutor:
+    # One pool for conversion and preprocessing across all message threads (and
+    # accounts), so CPU work stays bounded however many messages run at once.
+    workers = max(1, settings.processing.convert_workers, settings.ocr.preprocess_workers)
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def _ocr_document(
+    settings: Settings,
+    pdf: Path,
+    out_path: Path,
+    *,
+    pool: Executor,
+    ocr_slot: Callable[[], ContextManager],
+    profiler: Profiler | NullProfiler,
+) -> Path:
+    """OCR `pdf` into `out_path`, keeping its original page images.
+
+    With `ocr.preprocess`, tesseract reads a cleaned-up copy of the scanned pages and
+    only the resulting text layer is copied onto the original document.
+    """
+
+    prepped = None
+    if settings.ocr.preprocess:
+        with profiler.stage("preprocess"):
+            try:
+                prepped = preprocess_pdf(
+                    in_path=pdf,
+                    out_path=out_path.with_name(pdf.stem + ".prep.pdf"),
+                    options=preprocess_options(settings.ocr),
+                    pool=pool,
+                )
+            except Exception:
+                prepped = None
+
+    if prepped is not None:
+        prep_ocr = out_path.with_name(pdf.stem + ".prep.ocr.pdf")
+        with ocr_slot(), profiler.stage("ocr"):
+            ocr_pdf(in_path=prepped.path, out_path=prep_ocr)
+        try:
+            with profiler.stage("text_layer"):
+                return apply_text_layer(original=pdf, ocred=prep_ocr, out_path=out_path, pages=prepped.pages)
+        except Exception:
+            pass  # e.g. a PDF pdfium can't edit: OCR the original instead
+
+    with ocr_slot(), profiler.stage("ocr"):
+        return ocr_pdf(in_path=pdf, out_path=out_path)
+
+
+def _list_newest(
+    gmail, *, user_id: str, label_id: str, queries: list[str], max_messages: int
+) -> list[GmailMessage]:
+    """The newest `max_messages` messages matching any of `queries`.
+
+    Every query is listed up to the full budget (Gmail returns newest first), then
+    the lists are merged by `internalDate`; metadata is only fetched as the merge
+    reaches a message, so at most `max_messages + len(queries)` are fetched.
+    """
+
+    fetched: dict[str, GmailMessage] = {}
+
+    def fetch(refs: list[GmailMessageRef]) -> Iterator[GmailMessage]:
+        for ref in refs:
+            if ref.id not in fetched:
+                fetched[ref.id] = get_message(gmail, user_id=user_id, message_id=ref.id)
+            yield fetched[ref.id]
+
+    streams = [
+        fetch(list_messages_with_label(gmail, user_id=user_id, label_id=label_id, max_results=max_messages, query=q))
+        for q in queries
+    ]
+    out: dict[str, GmailMessage] = {}
+    if max_messages <= 0:
+        return []
+    for msg in heapq.merge(*streams, key=lambda m: -m.internal_date_ms):
+        out.setdefault(msg.id, msg)
+        if len(out) >= max_messages:
+            break
+    return list(out.values())
+
+
+def run_once(
+    *,
+    settings: Settings,
+    creds: CredentialManager,
+    dry_run: bool | None = None,
+    account: str = "",
+    ocr_slot: Callable[[], ContextManager] | None = None,
+    process_pool: Executor | None = None,
+    profiler: Profiler | None = None,
+) -> list[ProcessResult]:
     dry = settings.processing.dry_run if dry_run is None else dry_run
+    profiler = profiler or NullProfiler()
+
+    # `run_accounts` hands in slots shared with the other accounts; on its own a
+    # run still keeps at most `ocr_workers` OCR processes going.
+    ocr_slot = ocr_slot or partial(FairSlots(settings.processing.ocr_workers).slot, account)
+    own_pool = process_pool is None
+    cpu_pool = _process_pool(settings) if own_pool else process_pool
+
+    rps = settings.processing.max_requests_per_second
+    limiter = RateLimiter(rps) if rps > 0 else None
+
+    # googleapiclient services aren't thread-safe, so each worker thread builds its
+    # own on top of that thread's pooled HTTP session.
+    local = threading.local()
+
+    def services():
+        if not hasattr(local, "gmail"):
+            local.gmail = _build_service("gmail", "v1", creds=creds, limiter=limiter)
+            local.drive = _build_service("drive", "v3", creds=creds, limiter=limiter)
+            local.sheets = _build_service("sheets", "v4", creds=creds, limiter=limiter) if settings.sheets else None
+        return local.gmail, local.drive, local.sheets
 
-    gmail = build("gmail", "v1", credentials=creds)
-    drive = build("drive", "v3", credentials=creds)
-    sheets = build("sheets", "v4", credentials=creds) if settings.sheets else None
+    gmail, drive, _ = services()
 
     user_id = "me"
     label_inbox_id = get_or_create_label(gmail, user_id=user_id, label_name=settings.gmail.label_inbox)
@@ -58,69 +196,149 @@ def run_once(*, settings: Settings, creds, dry_run: bool | None = None) -> list[
 
     folder_id = get_or_create_folder(drive, folder_name=settings.drive.target_folder_name)
 
-    # Fetch messages labeled TA/Admin but NOT already processed
-    msg_refs = gmail.users().messages().list(
-        userId=user_id,
-        labelIds=[label_inbox_id],
-        maxResults=settings.processing.max_messages,
-        q=f"-label:{settings.gmail.label_processed}",
-    ).execute()
+    # Fetch messages labeled TA/Admin but NOT already processed. The allowlist is
+    # pushed into the query so mail from other senders is never downloaded.
+    senders = SenderMatcher.from_patterns(settings.allowlisted_senders)
+    base_query = f"-label:{settings.gmail.label_processed}"
+    queries = [f"{base_query} {q}" for q in from_queries(senders.query_terms())] or [base_query]
+
+    messages = _list_newest(
+        gmail,
+        user_id=user_id,
+        label_id=label_inbox_id,
+        queries=queries,
+        max_messages=settings.processing.max_messages,
+    )
 
-    results: list[ProcessResult] = []
+    workdir = Path(settings.processing.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    retry_log = RetryLog(workdir / "retries.json")
 
-    for m in msg_refs.get("messages", []) or []:
-        msg_id = m["id"]
-        full = get_message_full(gmail, user_id=user_id, message_id=msg_id)
-        sender = message_from_address(full)
-        subj = message_subject(full) or "(no subject)"
+    ledger = open_ledger(Path(settings.ledger.path)) if (settings.ledger.enabled and not dry) else None
+    ledger_lock = threading.Lock()
+
+    results: list[ProcessResult] = []
+    queue: list[WorkItem] = []
 
-        if settings.allowlisted_senders and (sender not in [s.lower() for s in settings.allowlisted_senders]):
-            results.append(ProcessResult(message_id=msg_id, processed=False, reason="sender not allowlisted"))
+    for msg in messages:
+        # `from:` is a loose server-side match; the compiled matcher has the final say.
+        if not senders.matches(msg.sender):
+            results.append(ProcessResult(message_id=msg.id, processed=False, reason="sender not allowlisted"))
             continue
 
-        workdir = Path(settings.processing.workdir)
-        workdir.mkdir(parents=True, exist_ok=True)
+        heapq.heappush(
+            queue,
+            make_work_item(msg, retries=retry_log.get(msg.id), priorities=settings.processing.sender_priority),
+        )
+
+    upload_sessions = UploadSessions(workdir / "uploads.json")
+    upload_sessions.prune()
+    uploads = ThreadPoolExecutor(max_workers=max(1, settings.drive.upload_workers), thread_name_prefix="upload")
+
+    def upload_document(path: Path, filename: str) -> dict:
+        _, drive, _ = services()
+        return upload_pdf(
+            drive,
+            path=str(path),
+            folder_id=folder_id,
+            filename=filename,
+            chunk_size=settings.drive.upload_chunk_mb * 1024 * 1024,
+            sessions=upload_sessions,
+        )
+
+    def process(msg: GmailMessage) -> None:
+        gmail, _, sheets = services()
+        msg_id = msg.id
+        sender = msg.sender
+        subj = msg.subject or "(no subject)"
+
         msg_dir = workdir / msg_id
         msg_dir.mkdir(parents=True, exist_ok=True)
 
         pdfs: list[Path] = []
-        for att in iter_attachments(gmail, user_id=user_id, message_full=full):
-            fn = _safe_filename(att.filename or "attachment")
-            p = msg_dir / fn
-            save_attachment(att, p)
-
-            # If attachment is already PDF keep, else attempt to convert? (not implemented)
-            mime, _ = mimetypes.guess_type(p.name)
-            if (att.mime_type == "application/pdf") or (mime == "application/pdf"):
-                pdfs.append(p)
+        to_convert: list[tuple[Path, str | None]] = []
+        with profiler.stage("download"):
+            for att in iter_attachments(gmail, user_id=user_id, message=msg):
+                fn = _safe_filename(att.filename or "attachment")
+                p = msg_dir / fn
+                save_attachment(att, p)
+
+                mime, _ = mimetypes.guess_type(p.name)
+                if (att.mime_type == "application/pdf") or (mime == "application/pdf"):
+                    pdfs.append(p)
+                elif is_convertible(p, att.mime_type):
+                    to_convert.append((p, att.mime_type))
+
+        # Images and office documents are turned into PDFs so they go through OCR/extract too.
+        with profiler.stage("convert"):
+            converted = convert_many(
+                to_convert,
+                out_dir=msg_dir,
+                max_side_px=settings.processing.image_max_side_px,
+                pool=cpu_pool,
+            )
+        pdfs.extend(p for p in converted if p is not None)
 
         if not pdfs:
-            body = get_message_body_text(full)
+            body = get_message_body_text(msg)
             rendered = msg_dir / f"{_safe_filename(subj)}.pdf"
-            render_email_to_pdf(body=body, out_path=rendered, subject=subj)
+            with profiler.stage("render"):
+                render_email_to_pdf(body=body, out_path=rendered, subject=subj)
             pdfs.append(rendered)
 
+        # Uploads go to the shared upload pool as soon as each PDF is ready and
+        # run while the remaining OCR and field extraction happen here.
+        documents: list[tuple[Path, str, Future | None]] = []
         for pdf in pdfs:
             ocr_out = msg_dir / (pdf.stem + ".ocr.pdf")
-            try:
-                ocr_pdf(in_path=pdf, out_path=ocr_out)
+            if not dry and upload_sessions.has_pending(
+                path=str(ocr_out), folder_id=folder_id, filename=_safe_filename(ocr_out.name)
+            ):
+                # An earlier run stopped mid-upload; OCR again would change the bytes
+                # and the saved session could not be resumed.
                 final_pdf = ocr_out
-            except Exception:
-                final_pdf = pdf
+            else:
+                try:
+                    ensure_ocr_dependencies()
+                    final_pdf = _ocr_document(
+                        settings, pdf, ocr_out, pool=cpu_pool, ocr_slot=ocr_slot, profiler=profiler
+                    )
+                except Exception:
+                    # Resumes an interrupted upload of the un-OCR'd file, if there is one.
+                    final_pdf = pdf
+                else:
+                    # An earlier run's fallback upload of the original is superseded.
+                    upload_sessions.drop(
+                        UploadSessions.key(path=str(pdf), folder_id=folder_id, filename=_safe_filename(pdf.name))
+                    )
 
             upload_name = _safe_filename(final_pdf.name)
+            upload = None if dry else uploads.submit(upload_document, final_pdf, upload_name)
+            documents.append((final_pdf, upload_name, upload))
 
-            if dry:
+        for final_pdf, upload_name, upload in documents:
+            with profiler.stage("extract"):
+                fields = extract_fields_from_pdf(str(final_pdf), vendor_hint=sender)
+
+            if upload is None:
                 drive_meta = {"id": "DRY_RUN", "webViewLink": None, "name": upload_name}
             else:
-                drive_meta = upload_pdf(
-                    drive,
-                    path=str(final_pdf),
-                    folder_id=folder_id,
-                    filename=upload_name,
-                )
-
-            fields = extract_fields_from_pdf(str(final_pdf), vendor_hint=sender)
+                with profiler.stage("upload"):
+                    drive_meta = upload.result()
+
+            if ledger is not None:
+                with ledger_lock, profiler.stage("ledger"):
+                    record_invoice(
+                        ledger,
+                        fields=fields,
+                        message_id=msg_id,
+                        document=upload_name,
+                        account=account,
+                        drive_link=drive_meta.get("webViewLink"),
+                        subject=subj,
+                        sender=sender,
+                        app_version=__version__,
+                    )
 
             if sheets and settings.sheets:
                 missing = [k for k in ["invoice_date", "vendor", "total"] if not getattr(fields, k)]
@@ -160,13 +378,101 @@ def run_once(*, settings: Settings, creds, dry_run: bool | None = None) -> list[
                         )
 
         if not dry:
-            modify_labels(
-                gmail,
-                user_id=user_id,
-                message_id=msg_id,
-                add_label_ids=[label_processed_id],
-            )
+            with profiler.stage("label"):
+                modify_labels(
+                    gmail,
+                    user_id=user_id,
+                    message_id=msg_id,
+                    add_label_ids=[label_processed_id],
+                )
+
+    # Retries get their own, smaller concurrency budget so a batch of previously
+    # failing messages can't occupy every worker.
+    retry_slots = threading.BoundedSemaphore(max(1, settings.processing.retry_workers))
 
-        results.append(ProcessResult(message_id=msg_id, processed=True, reason=None))
+    def run_item(item: WorkItem) -> ProcessResult:
+        with retry_slots if item.is_retry else nullcontext():
+            try:
+                with profiler.message(item.message.id, replay_dir=workdir / item.message.id):
+                    process(item.message)
+            except Exception as e:
+                retry_log.record_failure(item.message.id)
+                return ProcessResult(message_id=item.message.id, processed=False, reason=f"error: {e}")
+        retry_log.clear(item.message.id)
+        return ProcessResult(message_id=item.message.id, processed=True, reason=None)
+
+    # Work is submitted in priority order; the executor's FIFO queue preserves it.
+    ordered = [heapq.heappop(queue) for _ in range(len(queue))]
+    workers = max(1, settings.processing.message_workers)
+    try:
+        if workers == 1:
+            results.extend(run_item(item) for item in ordered)
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="message") as message_pool:
+                results.extend(message_pool.map(run_item, ordered))
+    finally:
+        uploads.shutdown()
+        if own_pool:
+            cpu_pool.shutdown()
+        retry_log.save()
+        if ledger is not None:
+            ledger.close()
 
     return results
+
+
+def run_accounts(
+    *,
+    settings: Settings,
+    credentials_path: Path | None = None,
+    dry_run: bool | None = None,
+    profiler: Profiler | None = None,
+) -> list[AccountResult]:
+    """Run every configured account concurrently in this process.
+
+    Accounts share one pool of OCR slots (handed out fairly) and each gets its own
+    API request budget, so one busy mailbox can't starve the others.
+    """
+
+    ocr_slots = FairSlots(settings.processing.ocr_workers)
+    scopes = list({*GMAIL_SCOPES, *DRIVE_SCOPES, *SHEETS_SCOPES})
+
+    # Credentials are loaded up front, one account at a time, so a first-run
+    # browser consent flow never runs concurrently with another.
+    out: dict[str, AccountResult] = {}
+    ready: list[tuple[AccountSettings, CredentialManager]] = []
+    for account in settings.accounts:
+        try:
+            creds = get_credential_manager(
+                scopes=scopes,
+                credentials_path=credentials_path,
+                token_path=account_token_path(account.name, account.token_path),
+            )
+            ready.append((account, creds))
+        except Exception as e:
+            out[account.name] = AccountResult(account=account.name, error=f"{type(e).__name__}: {e}")
+
+    def _run(item: tuple[AccountSettings, CredentialManager]) -> AccountResult:
+        account, creds = item
+        try:
+            results = run_once(
+                settings=resolve_account(settings, account),
+                creds=creds,
+                dry_run=dry_run,
+                account=account.name,
+                ocr_slot=lambda: ocr_slots.slot(account.name),
+                process_pool=process_pool,
+                profiler=profiler,
+            )
+            return AccountResult(account=account.name, results=results)
+        except Exception as e:
+            return AccountResult(account=account.name, error=f"{type(e).__name__}: {e}")
+
+    if ready:
+        workers = max(1, min(settings.processing.max_parallel_accounts, len(ready)))
+        with _process_pool(settings) as process_pool:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="account") as pool:
+                for r in pool.map(_run, ready):
+                    out[r.account] = r
+
+    return [out[a.name] for a in settings.accounts]
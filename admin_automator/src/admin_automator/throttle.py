@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+
+class RateLimiter:
+    """Thread-safe token bucket: at most `rate` acquisitions per second, bursting to `burst`."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class FairSlots:
+    """A counting semaphore shared between accounts.
+
+    When a slot frees up, it goes to the waiting account currently holding the fewest
+    slots, so one account with a deep backlog can't starve the others.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._cond = threading.Condition()
+        self._in_use: dict[str, int] = defaultdict(int)
+        self._waiting: dict[str, int] = defaultdict(int)
+
+    def _my_turn(self, account: str) -> bool:
+        if sum(self._in_use.values()) >= self.capacity:
+            return False
+        waiting = [a for a, n in self._waiting.items() if n > 0]
+        return self._in_use[account] <= min(self._in_use[a] for a in waiting)
+
+    def acquire(self, account: str) -> None:
+        with self._cond:
+            self._waiting[account] += 1
+            try:
+                self._cond.wait_for(lambda: self._my_turn(account))
+            finally:
+                self._waiting[account] -= 1
+            self._in_use[account] += 1
+
+    def release(self, account: str) -> None:
+        with self._cond:
+            self._in_use[account] -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, account: str) -> Iterator[None]:
+        self.acquire(account)
+        try:
+            yield
+        finally:
+            self.release(account)
+
+
+class ThrottledHttp:
+    """Wrap an httplib2-compatible object so every request passes through a `RateLimiter`."""
+
+    def __init__(self, http: Any, limiter: RateLimiter):
+        self._http = http
+        self._limiter = limiter
+
+    def request(self, *args: Any, **kwargs: Any) -> Any:
+        self._limiter.acquire()
+        return self._http.request(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._http, name)
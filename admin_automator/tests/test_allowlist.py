@@ -0,0 +1,35 @@
+from admin_automator.allowlist import SenderMatcher, from_queries
+
+
+def test_matcher_addresses_domains_and_wildcards():
+    m = SenderMatcher.from_patterns(
+        ["Billing@Vendor.com", "@shop.nl", "*@other.org", "plain.io", "*.bigcorp.com"]
+    )
+    assert m.matches("billing@vendor.com")
+    assert not m.matches("sales@vendor.com")
+    assert m.matches("anyone@shop.nl")
+    assert m.matches("x@other.org")
+    assert m.matches("x@plain.io")
+    assert m.matches("x@eu.billing.bigcorp.com")
+    assert m.matches("x@bigcorp.com")
+    assert not m.matches("x@notbigcorp.com")
+    assert not m.matches(None)
+
+
+def test_empty_matcher_allows_all():
+    m = SenderMatcher.from_patterns([])
+    assert m.allows_all
+    assert m.matches("anyone@anywhere.com")
+    assert m.query_terms() == []
+    assert from_queries(m.query_terms()) == []
+
+
+def test_from_queries_chunks_within_limit():
+    terms = [f"sender{i}@vendor{i}.com" for i in range(100)]
+    queries = from_queries(terms, max_chars=300)
+
+    assert len(queries) > 1
+    assert all(len(q) <= 300 for q in queries)
+    assert all(q.startswith("from:(") and q.endswith(")") for q in queries)
+    joined = " OR ".join(q[len("from:(") : -1] for q in queries)
+    assert joined.split(" OR ") == terms
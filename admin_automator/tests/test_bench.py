@@ -0,0 +1,31 @@
+from pathlib import Path
+
+from reportlab.pdfgen import canvas
+
+from admin_automator import bench
+from admin_automator.config import OcrSettings
+
+
+def test_run_case_records_broken_pdfs_and_keeps_going(tmp_path: Path, monkeypatch):
+    case = tmp_path / "case"
+    case.mkdir()
+    (case / "broken.pdf").write_bytes(b"%PDF-1.4 not really")
+    c = canvas.Canvas(str(case / "good.pdf"))
+    c.drawString(50, 800, "Invoice Date: 2026-02-01")
+    c.save()
+    ocr_inputs: list[str] = []
+
+    def fake_ocr(*, in_path: Path, out_path: Path) -> Path:
+        ocr_inputs.append(in_path.name)
+        out_path.write_bytes(in_path.read_bytes())
+        return out_path
+
+    monkeypatch.setattr(bench, "ocr_pdf", fake_ocr)
+
+    r = bench.run_case(case, workdir=tmp_path / "bench", preprocess=OcrSettings(preprocess_workers=1))
+
+    assert r.documents == 2
+    assert r.error and "broken.pdf: preprocess failed" in r.error
+    assert "good.pdf" not in r.error
+    # the broken file still went through OCR of the original, like in the runner
+    assert sorted(ocr_inputs) == ["broken.pdf", "good.pdf"]
@@ -1,6 +1,9 @@
 from pathlib import Path
 
-from admin_automator.config import load_settings
+import pytest
+from pydantic import ValidationError
+
+from admin_automator.config import load_settings, resolve_account
 
 
 def test_load_settings_defaults_when_missing(tmp_path: Path):
@@ -22,3 +25,42 @@ sheets:
     s = load_settings(p)
     assert s.allowlisted_senders == ["billing@example.com"]
     assert s.sheets and s.sheets.spreadsheet_id == "SHEET"
+
+
+def test_accounts_inherit_and_override(tmp_path: Path):
+    p = tmp_path / "config.yaml"
+    p.write_text(
+        """
+allowlisted_senders:
+  - billing@example.com
+sheets:
+  spreadsheet_id: SHARED
+processing:
+  workdir: work
+accounts:
+  - name: a
+  - name: b
+    allowlisted_senders: [other@example.com]
+    sheets:
+      spreadsheet_id: B_SHEET
+    max_requests_per_second: 2
+""".lstrip()
+    )
+    s = load_settings(p)
+    a, b = (resolve_account(s, acc) for acc in s.accounts)
+
+    assert a.allowlisted_senders == ["billing@example.com"]
+    assert a.sheets and a.sheets.spreadsheet_id == "SHARED"
+    assert a.processing.workdir == str(Path("work") / "a")
+    assert a.accounts == []
+
+    assert b.allowlisted_senders == ["other@example.com"]
+    assert b.sheets and b.sheets.spreadsheet_id == "B_SHEET"
+    assert b.processing.max_requests_per_second == 2
+
+
+def test_duplicate_account_names_are_rejected(tmp_path: Path):
+    p = tmp_path / "config.yaml"
+    p.write_text("accounts:\n  - name: a\n  - name: a\n")
+    with pytest.raises(ValidationError, match="duplicate account name"):
+        load_settings(p)
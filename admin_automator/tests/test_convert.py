@@ -0,0 +1,88 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from admin_automator.convert import ConvertError, _soffice_profile, convert_many, convert_to_pdf, is_convertible
+
+
+def _make_image(path: Path, size=(400, 200), dpi=None) -> Path:
+    Image = pytest.importorskip("PIL.Image")
+    Image.new("RGB", size, "white").save(path, **({"dpi": dpi} if dpi else {}))
+    return path
+
+
+def test_is_convertible_by_extension_and_declared_type(tmp_path: Path):
+    assert is_convertible(tmp_path / "receipt.jpg")
+    assert is_convertible(tmp_path / "invoice.docx")
+    assert is_convertible(tmp_path / "blob", "image/png")
+    assert not is_convertible(tmp_path / "notes.txt")
+    assert not is_convertible(tmp_path / "invoice.pdf")
+
+
+def test_convert_image_to_pdf_downscales(tmp_path: Path):
+    pdfplumber = pytest.importorskip("pdfplumber")
+    src = _make_image(tmp_path / "receipt.png", size=(4000, 2000))
+    out = convert_to_pdf(in_path=src, out_path=tmp_path / "receipt.pdf", max_side_px=1000)
+
+    assert out.read_bytes().startswith(b"%PDF")
+    with pdfplumber.open(out) as pdf:
+        assert len(pdf.pages) == 1
+        img = pdf.pages[0].images[0]
+        assert max(img["srcsize"]) == 1000
+
+
+def test_downscaled_image_keeps_physical_page_size(tmp_path: Path):
+    pdfplumber = pytest.importorskip("pdfplumber")
+    # A4 at 600 dpi: 4961 x 7016 px, 8.27 x 11.69 in
+    src = _make_image(tmp_path / "scan.png", size=(4961, 7016), dpi=(600, 600))
+    out = convert_to_pdf(in_path=src, out_path=tmp_path / "scan.pdf", max_side_px=3508)
+
+    with pdfplumber.open(out) as pdf:
+        page = pdf.pages[0]
+        assert page.width / 72 == pytest.approx(8.27, abs=0.02)
+        assert page.height / 72 == pytest.approx(11.69, abs=0.02)
+
+
+def test_convert_unsupported_type_raises(tmp_path: Path):
+    src = tmp_path / "notes.txt"
+    src.write_text("hello")
+    with pytest.raises(ConvertError):
+        convert_to_pdf(in_path=src, out_path=tmp_path / "notes.pdf")
+
+
+def test_convert_many_keeps_order_and_marks_failures(tmp_path: Path):
+    a = _make_image(tmp_path / "a.png")
+    bad = tmp_path / "b.jpg"
+    bad.write_bytes(b"not an image")
+    c = _make_image(tmp_path / "c.png")
+
+    out = convert_many([(a, None), (bad, None), (c, None)], out_dir=tmp_path / "out", max_workers=2)
+
+    assert out[0] == tmp_path / "out" / "a.png.pdf"
+    assert out[1] is None
+    assert out[2] == tmp_path / "out" / "c.png.pdf"
+
+
+def test_convert_many_uses_shared_pool(tmp_path: Path):
+    items = [(_make_image(tmp_path / f"{n}.png"), None) for n in "abc"]
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        out = convert_many(items, out_dir=tmp_path / "out", pool=pool)
+    assert out == [tmp_path / "out" / f"{n}.png.pdf" for n in "abc"]
+
+
+def test_soffice_profiles_are_exclusive_and_reused():
+    with _soffice_profile() as first:
+        other: list[Path] = []
+        t = threading.Thread(target=lambda: other.append(_held_profile()))
+        t.start()
+        t.join()
+        assert other[0] != first  # busy slot is skipped
+    with _soffice_profile() as again:
+        assert again == first  # freed slot is reused
+
+
+def _held_profile() -> Path:
+    with _soffice_profile() as p:
+        return p
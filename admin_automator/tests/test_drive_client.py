@@ -0,0 +1,103 @@
+import json
+from pathlib import Path
+
+import pytest
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpMockSequence
+
+from admin_automator.drive_client import UploadSessions, upload_pdf
+
+CHUNK = 256 * 1024
+SESSION_URI = "https://upload.example/session/abc"
+
+
+def _drive(responses):
+    http = HttpMockSequence(responses)
+    return build("drive", "v3", http=http, static_discovery=True), http
+
+
+def _pdf(tmp_path: Path) -> Path:
+    p = tmp_path / "scan.ocr.pdf"
+    p.write_bytes(b"%PDF" + b"x" * (3 * CHUNK - 4))
+    return p
+
+
+def test_interrupted_upload_resumes_from_saved_offset(tmp_path: Path):
+    pdf = _pdf(tmp_path)
+    sessions = UploadSessions(tmp_path / "uploads.json")
+
+    drive, _ = _drive(
+        [
+            ({"status": "200", "location": SESSION_URI}, ""),
+            ({"status": "308", "range": f"bytes=0-{CHUNK - 1}"}, ""),
+            ({"status": "400"}, "connection dropped"),
+        ]
+    )
+    with pytest.raises(HttpError):
+        upload_pdf(drive, path=str(pdf), folder_id="F", filename="scan.pdf", chunk_size=CHUNK, sessions=sessions)
+
+    saved = json.loads((tmp_path / "uploads.json").read_text())
+    [entry] = saved.values()
+    assert entry["uri"] == SESSION_URI and entry["offset"] == CHUNK
+
+    # New process: no new session is created; the server is asked for its offset first.
+    drive, http = _drive(
+        [
+            ({"status": "308", "range": f"bytes=0-{CHUNK - 1}"}, ""),
+            ({"status": "308", "range": f"bytes=0-{2 * CHUNK - 1}"}, ""),
+            ({"status": "200"}, json.dumps({"id": "FILE", "name": "scan.pdf"})),
+        ]
+    )
+    created = upload_pdf(
+        drive,
+        path=str(pdf),
+        folder_id="F",
+        filename="scan.pdf",
+        chunk_size=CHUNK,
+        sessions=UploadSessions(tmp_path / "uploads.json"),
+    )
+    assert created["id"] == "FILE"
+    assert http._iterable == []
+    assert json.loads((tmp_path / "uploads.json").read_text()) == {}
+
+
+def test_saved_session_is_ignored_when_file_changed(tmp_path: Path):
+    pdf = _pdf(tmp_path)
+    sessions = UploadSessions(tmp_path / "uploads.json")
+    key = UploadSessions.key(path=str(pdf), folder_id="F", filename="scan.pdf")
+    sessions.put(key, str(pdf), uri=SESSION_URI, offset=CHUNK)
+    assert sessions.has_pending(path=str(pdf), folder_id="F", filename="scan.pdf")
+
+    pdf.write_bytes(b"%PDF" + b"y" * (3 * CHUNK - 4))  # same size, different bytes
+    assert sessions.get(key, str(pdf)) is None
+    assert not sessions.has_pending(path=str(pdf), folder_id="F", filename="scan.pdf")
+
+
+def test_upload_that_already_finished_is_not_sent_again(tmp_path: Path):
+    pdf = _pdf(tmp_path)
+    sessions = UploadSessions(tmp_path / "uploads.json")
+    key = UploadSessions.key(path=str(pdf), folder_id="F", filename="scan.pdf")
+    sessions.put(key, str(pdf), uri=SESSION_URI, offset=2 * CHUNK)
+
+    # The last chunk arrived but the process died before recording it.
+    drive, http = _drive([({"status": "200"}, json.dumps({"id": "FILE", "name": "scan.pdf"}))])
+    created = upload_pdf(drive, path=str(pdf), folder_id="F", filename="scan.pdf", chunk_size=CHUNK, sessions=sessions)
+
+    assert created["id"] == "FILE"
+    assert http._iterable == []
+    assert not sessions.has_pending(path=str(pdf), folder_id="F", filename="scan.pdf")
+
+
+def test_prune_drops_sessions_for_missing_or_changed_files(tmp_path: Path):
+    kept, gone = _pdf(tmp_path), tmp_path / "gone.pdf"
+    gone.write_bytes(b"%PDF-gone")
+    sessions = UploadSessions(tmp_path / "uploads.json")
+    for p in (kept, gone):
+        sessions.put(UploadSessions.key(path=str(p), folder_id="F", filename=p.name), str(p), uri=SESSION_URI, offset=0)
+    gone.unlink()
+
+    UploadSessions(tmp_path / "uploads.json").prune()
+
+    saved = json.loads((tmp_path / "uploads.json").read_text())
+    assert list(saved) == [UploadSessions.key(path=str(kept), folder_id="F", filename=kept.name)]
@@ -0,0 +1,65 @@
+import base64
+
+from admin_automator.gmail_client import GmailMessage, get_message_body_text, parse_message, parse_parts
+
+
+def _b64(s: str) -> str:
+    return base64.urlsafe_b64encode(s.encode("utf-8")).decode("ascii")
+
+
+def test_parse_message_from_metadata():
+    raw = {
+        "id": "m1",
+        "threadId": "t1",
+        "internalDate": "1767225600000",
+        "sizeEstimate": 12345,
+        "snippet": "Your invoice",
+        "payload": {
+            "headers": [
+                {"name": "From", "value": "Billing <Billing@Vendor.com>"},
+                {"name": "Subject", "value": "Invoice 1001"},
+                {"name": "Date", "value": "Thu, 1 Jan 2026 00:00:00 +0000"},
+            ]
+        },
+    }
+    msg = parse_message(raw)
+    assert msg.sender == "billing@vendor.com"
+    assert msg.subject == "Invoice 1001"
+    assert msg.date.startswith("Thu")
+    assert msg.size_estimate == 12345
+    assert msg.internal_date_ms == 1767225600000
+    assert msg.parts is None
+
+
+def test_parse_parts_drops_unused_payload():
+    payload = {
+        "mimeType": "multipart/mixed",
+        "body": {"size": 0},
+        "parts": [
+            {"mimeType": "text/plain", "body": {"data": _b64("hello"), "size": 5}},
+            {"mimeType": "image/png", "body": {"data": _b64("inline-image"), "size": 12}},
+            {
+                "mimeType": "application/pdf",
+                "filename": "invoice.pdf",
+                "body": {"attachmentId": "A1", "size": 2048},
+            },
+        ],
+    }
+    parts = parse_parts(payload)
+    assert {p.mime_type for p in parts} == {"text/plain", "application/pdf"}
+    att = next(p for p in parts if p.attachment_id)
+    assert att.filename == "invoice.pdf" and att.size == 2048 and att.data is None
+
+
+def test_body_text_prefers_plain_and_falls_back_to_snippet():
+    payload = {
+        "mimeType": "multipart/alternative",
+        "parts": [
+            {"mimeType": "text/html", "body": {"data": _b64("<html><body>hi</body></html>")}},
+            {"mimeType": "text/plain", "body": {"data": _b64("hi")}},
+        ],
+    }
+    msg = GmailMessage(id="m1", parts=parse_parts(payload))
+    assert get_message_body_text(msg) == "hi"
+
+    assert get_message_body_text(GmailMessage(id="m2", snippet="snip", parts=[])) == "snip"
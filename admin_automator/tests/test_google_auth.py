@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+
+from admin_automator.google_auth import CredentialManager, _SharedCredentials
+
+
+class FakeCredentials:
+    def __init__(self, expires_in: timedelta):
+        self.token = "t0"
+        self.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + expires_in
+        self.refreshes = 0
+
+    def refresh(self, request):
+        time.sleep(0.02)  # widen the race window
+        self.refreshes += 1
+        self.token = f"t{self.refreshes}"
+        self.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+
+    def apply(self, headers, token=None):
+        headers["authorization"] = f"Bearer {token or self.token}"
+
+    def to_json(self):
+        return json.dumps({"token": self.token})
+
+
+def test_refreshes_ahead_of_expiry_once_across_threads(tmp_path: Path):
+    creds = FakeCredentials(expires_in=timedelta(minutes=1))  # inside the refresh-ahead window
+    token_path = tmp_path / "token.json"
+    manager = CredentialManager(creds, token_path=token_path)
+
+    threads = [threading.Thread(target=manager.ensure_fresh, args=(object(),)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert creds.refreshes == 1
+    assert json.loads(token_path.read_text()) == {"token": "t1"}
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_valid_token_is_not_refreshed():
+    creds = FakeCredentials(expires_in=timedelta(hours=1))
+    CredentialManager(creds).ensure_fresh(object())
+    assert creds.refreshes == 0
+
+
+def test_refresh_after_401_skips_if_token_already_replaced():
+    creds = FakeCredentials(expires_in=timedelta(hours=1))
+    manager = CredentialManager(creds)
+
+    manager.refresh(object(), stale_token="t0")
+    manager.refresh(object(), stale_token="t0")  # second thread saw the same 401
+    assert creds.refreshes == 1
+
+
+class ExpiringHttp:
+    """Rejects `t0` with a 401; the "late" thread's 401 arrives after the other thread refreshed."""
+
+    def __init__(self, both_sent: threading.Barrier):
+        self.both_sent = both_sent
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        if headers["authorization"] == "Bearer t0":
+            self.both_sent.wait()
+            if threading.current_thread().name == "late":
+                time.sleep(0.1)
+            return httplib2.Response({"status": 401}), b""
+        return httplib2.Response({"status": 200}), b"ok"
+
+
+def test_concurrent_401s_on_same_token_refresh_once():
+    creds = FakeCredentials(expires_in=timedelta(hours=1))
+    manager = CredentialManager(creds)
+    both_sent = threading.Barrier(2)
+    statuses: list[int] = []
+
+    def call():
+        http = AuthorizedHttp(_SharedCredentials(manager), http=ExpiringHttp(both_sent))
+        resp, _ = http.request("https://example.invalid/")
+        statuses.append(resp.status)
+
+    threads = [threading.Thread(target=call, name=name) for name in ("early", "late")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert statuses == [200, 200]
+    assert creds.refreshes == 1
+
+
+def test_authorized_http_is_per_thread():
+    manager = CredentialManager(FakeCredentials(expires_in=timedelta(hours=1)))
+    main = manager.authorized_http()
+    assert manager.authorized_http() is main
+
+    other: list = []
+    t = threading.Thread(target=lambda: other.append(manager.authorized_http()))
+    t.start()
+    t.join()
+    assert other[0] is not main
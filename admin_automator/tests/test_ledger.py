@@ -0,0 +1,64 @@
+import sqlite3
+from pathlib import Path
+
+from admin_automator.extract import ExtractedFields
+from admin_automator.ledger import find_duplicates, open_ledger, record_invoice, totals_by_vendor, vat_by_quarter
+
+
+def _fields(date: str, vendor: str, total: str, vat: str | None = None) -> ExtractedFields:
+    return ExtractedFields(invoice_date=date, vendor=vendor, total=total, vat_amount=vat)
+
+
+def test_ledger_reports(tmp_path: Path):
+    conn = open_ledger(tmp_path / "ledger.sqlite3")
+    record_invoice(conn, fields=_fields("2026-01-15", "acme", "121.00", "21.00"), message_id="m1", document="a.pdf")
+    record_invoice(conn, fields=_fields("2026-02-01", "acme", "60.50", "10.50"), message_id="m2", document="b.pdf")
+    record_invoice(conn, fields=_fields("2026-04-03", "globex", "10.00", "1.74"), message_id="m3", document="c.pdf")
+    # re-running the same message replaces its row instead of duplicating it
+    record_invoice(conn, fields=_fields("2026-04-03", "globex", "10.00", "1.74"), message_id="m3", document="c.pdf")
+
+    vendors = {r.key: (r.count, r.amount) for r in totals_by_vendor(conn)}
+    assert vendors == {"acme": (2, "181.50"), "globex": (1, "10.00")}
+
+    quarters = {r.key: r.amount for r in vat_by_quarter(conn)}
+    assert quarters == {"2026-Q1": "31.50", "2026-Q2": "1.74"}
+
+    assert find_duplicates(conn) == []
+
+
+def test_ledger_finds_duplicates_across_messages(tmp_path: Path):
+    conn = open_ledger(tmp_path / "ledger.sqlite3")
+    record_invoice(conn, fields=_fields("2026-01-15", "acme", "121.00"), message_id="m1", document="a.pdf")
+    record_invoice(conn, fields=_fields("2026-01-15", "acme", "121.00"), message_id="m9", document="fwd.pdf")
+
+    dups = find_duplicates(conn)
+    assert len(dups) == 1
+    assert dups[0].message_ids == ["m1", "m9"]
+
+
+def test_ledger_rows_are_kept_per_account(tmp_path: Path):
+    conn = open_ledger(tmp_path / "ledger.sqlite3")
+    # same message id and document name in two mailboxes must not overwrite each other
+    record_invoice(conn, fields=_fields("2026-01-15", "acme", "10.00"), message_id="m1", document="a.pdf", account="a")
+    record_invoice(conn, fields=_fields("2026-01-15", "acme", "20.00"), message_id="m1", document="a.pdf", account="b")
+
+    assert totals_by_vendor(conn)[0].amount == "30.00"
+    assert totals_by_vendor(conn, account="a")[0].amount == "10.00"
+    assert totals_by_vendor(conn, account="b")[0].amount == "20.00"
+
+
+def test_open_ledger_migrates_rows_without_account(tmp_path: Path):
+    path = tmp_path / "ledger.sqlite3"
+    old = sqlite3.connect(str(path))
+    old.execute(
+        "CREATE TABLE invoices (message_id TEXT NOT NULL, document TEXT NOT NULL, vendor TEXT, total TEXT, "
+        "total_cents INTEGER, recorded_at TEXT NOT NULL, PRIMARY KEY (message_id, document))"
+    )
+    old.execute("INSERT INTO invoices VALUES ('m1', 'a.pdf', 'acme', '5.00', 500, '2026-01-01T00:00:00')")
+    old.commit()
+    old.close()
+
+    conn = open_ledger(path)
+    assert totals_by_vendor(conn, account="")[0].amount == "5.00"
+    record_invoice(conn, fields=_fields("2026-01-15", "acme", "1.00"), message_id="m1", document="a.pdf", account="b")
+    assert len(totals_by_vendor(conn)) == 1 and totals_by_vendor(conn)[0].count == 2
@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import pypdfium2 as pdfium
+from PIL import Image, ImageDraw
+
+from admin_automator.preprocess import (
+    PageTransform,
+    PreprocessOptions,
+    apply_text_layer,
+    estimate_skew,
+    otsu_threshold,
+    pages_needing_ocr,
+    preprocess_pdf,
+)
+
+
+def _text_lines_image(size=(1200, 1600), angle: float = 0.0) -> Image.Image:
+    im = Image.new("L", size, 235)
+    d = ImageDraw.Draw(im)
+    for y in range(150, size[1] - 150, 60):
+        d.rectangle((120, y, size[0] - 120, y + 14), fill=30)
+    return im.rotate(angle, fillcolor=235) if angle else im
+
+
+def test_estimate_skew_recovers_rotation():
+    assert abs(estimate_skew(_text_lines_image(angle=2.0)) + 2.0) <= 0.5
+    assert abs(estimate_skew(_text_lines_image())) <= 0.25
+
+
+def test_otsu_threshold_splits_bimodal_image():
+    im = Image.new("L", (100, 100), 220)
+    im.paste(30, (0, 0, 50, 100))
+    assert 30 <= otsu_threshold(im) < 220
+
+
+def _scan_pdf(path: Path, dpi: int) -> Path:
+    im = _text_lines_image(size=(int(8.27 * dpi), int(11.69 * dpi)), angle=1.5).convert("RGB")
+    im.save(path, resolution=float(dpi))
+    return path
+
+
+def test_preprocess_only_rebuilds_scanned_pages(tmp_path: Path):
+    from reportlab.pdfgen import canvas
+
+    text_pdf = tmp_path / "text.pdf"
+    c = canvas.Canvas(str(text_pdf))
+    c.drawString(50, 800, "Invoice Date: 2026-02-01")
+    c.save()
+    scan = _scan_pdf(tmp_path / "scan.pdf", dpi=400)
+
+    mixed = pdfium.PdfDocument.new()
+    mixed.import_pages(pdfium.PdfDocument(str(text_pdf)))
+    mixed.import_pages(pdfium.PdfDocument(str(scan)))
+    mixed.save(str(tmp_path / "mixed.pdf"))
+    mixed.close()
+
+    assert pages_needing_ocr(tmp_path / "mixed.pdf") == [1]
+
+    out = preprocess_pdf(
+        in_path=tmp_path / "mixed.pdf",
+        out_path=tmp_path / "mixed.prep.pdf",
+        options=PreprocessOptions(target_dpi=150, auto_rotate=False),
+        max_workers=1,
+    )
+    assert out is not None and list(out.pages) == [1]
+    assert abs(out.pages[1].skew_degrees + 1.5) <= 0.5
+    pdf = pdfium.PdfDocument(str(out.path))
+    assert pdf[0].get_textpage().count_chars() > 0
+    [img] = pdf[1].get_objects(filter=[pdfium.raw.FPDF_PAGEOBJ_IMAGE])
+    px_w, _ = img.get_px_size()
+    assert abs(px_w - 8.27 * 150) < 3  # downsampled from 400 to 150 dpi
+    pdf.close()
+
+
+def test_preprocess_skips_pdfs_with_text(tmp_path: Path):
+    from reportlab.pdfgen import canvas
+
+    p = tmp_path / "text.pdf"
+    c = canvas.Canvas(str(p))
+    c.drawString(50, 800, "Total 10,00")
+    c.save()
+    assert preprocess_pdf(in_path=p, out_path=tmp_path / "out.pdf") is None
+
+
+def test_text_layer_goes_back_onto_original_pages(tmp_path: Path):
+    from reportlab.pdfgen import canvas
+
+    scan = _scan_pdf(tmp_path / "scan.pdf", dpi=200)
+    # Stand-in for ocrmypdf output of a preprocessed page that was turned 90 degrees
+    # clockwise: the cleaned-up image plus invisible text.
+    ocred = tmp_path / "scan.prep.ocr.pdf"
+    w, h = 11.69 * 72, 8.27 * 72
+    Image.new("L", (int(w), int(h)), 255).save(tmp_path / "prep.png")
+    c = canvas.Canvas(str(ocred), pagesize=(w, h))
+    c.drawImage(str(tmp_path / "prep.png"), 0, 0, w, h)
+    text = c.beginText(700, 560)
+    text.setTextRenderMode(3)
+    text.setFont("Helvetica", 12)
+    text.textLine("TOTAL 121.00")
+    c.drawText(text)
+    c.save()
+
+    out = apply_text_layer(
+        original=scan, ocred=ocred, out_path=tmp_path / "scan.ocr.pdf", pages={0: PageTransform(rotate=90)}
+    )
+
+    pdf = pdfium.PdfDocument(str(out))
+    page = pdf[0]
+    [img] = page.get_objects(filter=[pdfium.raw.FPDF_PAGEOBJ_IMAGE], max_depth=1)
+    assert img.get_px_size() == (int(8.27 * 200), int(11.69 * 200))  # original scan kept
+    textpage = page.get_textpage()
+    assert textpage.get_text_range().strip() == "TOTAL 121.00"
+    left, bottom, right, top = textpage.get_charbox(0)
+    # (700, 560) on the turned page is (h - 560, 700) on the upright original
+    assert abs(right - (h - 560)) < 2 and abs(bottom - 700) < 2
+    pdf.close()
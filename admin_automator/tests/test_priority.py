@@ -0,0 +1,52 @@
+import heapq
+from pathlib import Path
+
+from admin_automator.gmail_client import GmailMessage
+from admin_automator.priority import RetryLog, make_work_item, sender_priority
+
+
+def _msg(id: str, *, size: int = 10_000, received: int = 0, sender: str = "a@vendor.com") -> GmailMessage:
+    return GmailMessage(id=id, sender=sender, size_estimate=size, internal_date_ms=received)
+
+
+def _order(items) -> list[str]:
+    heap = list(items)
+    heapq.heapify(heap)
+    return [heapq.heappop(heap).message.id for _ in range(len(heap))]
+
+
+def test_small_fresh_messages_go_before_big_scans_and_retries():
+    items = [
+        make_work_item(_msg("old-small", received=1)),
+        make_work_item(_msg("new-small", received=2)),
+        make_work_item(_msg("big-scan", size=40 << 20, received=3)),
+        make_work_item(_msg("retry", received=4), retries=1),
+    ]
+    assert _order(items) == ["new-small", "old-small", "big-scan", "retry"]
+
+
+def test_sender_priority_by_address_and_domain():
+    prios = {"boss@corp.com": 10, "@vendor.com": 3}
+    assert sender_priority("Boss@Corp.com", prios) == 10
+    assert sender_priority("any@vendor.com", prios) == 3
+    assert sender_priority("x@elsewhere.com", prios) == 0
+
+    items = [
+        make_work_item(_msg("normal", received=9, sender="x@elsewhere.com"), priorities=prios),
+        make_work_item(_msg("vip", size=40 << 20, received=1, sender="boss@corp.com"), priorities=prios),
+    ]
+    assert _order(items) == ["vip", "normal"]
+
+
+def test_retry_log_persists(tmp_path: Path):
+    path = tmp_path / "retries.json"
+    log = RetryLog(path)
+    log.record_failure("m1")
+    log.record_failure("m1")
+    log.record_failure("m2")
+    log.clear("m2")
+    log.save()
+
+    again = RetryLog(path)
+    assert again.get("m1") == 2
+    assert again.get("m2") == 0
@@ -0,0 +1,39 @@
+import json
+import time
+from pathlib import Path
+
+from admin_automator.bench import collect_inputs
+from admin_automator.profiling import Profiler
+
+
+def test_profiler_records_stages_and_writes_summary(tmp_path: Path):
+    profiler = Profiler(tmp_path / "profile", top_n=1)
+    with profiler.message("fast"):
+        with profiler.stage("extract"):
+            pass
+    with profiler.message("slow", replay_dir=tmp_path / "slow"):
+        with profiler.stage("ocr"):
+            time.sleep(0.05)
+        with profiler.stage("ocr"):
+            time.sleep(0.01)
+    # stages outside a message are ignored
+    with profiler.stage("orphan"):
+        pass
+
+    summary = json.loads(profiler.write().read_text())
+    assert summary["messages"] == 2
+    [slowest] = summary["slowest"]
+    assert slowest["message_id"] == "slow"
+    assert slowest["replay_dir"] == str(tmp_path / "slow")
+    assert slowest["stages"]["ocr"] >= 0.06
+    assert Path(slowest["profile"]).exists()
+
+    folded = (tmp_path / "profile" / "stages.folded").read_text().splitlines()
+    assert any(line.startswith("slow;ocr ") for line in folded)
+    assert not any("orphan" in line for line in folded)
+
+
+def test_bench_collect_inputs_skips_derived_files(tmp_path: Path):
+    for name in ["invoice.pdf", "invoice.ocr.pdf", "photo.jpg", "photo.jpg.pdf", "notes.txt"]:
+        (tmp_path / name).write_bytes(b"")
+    assert [p.name for p in collect_inputs(tmp_path)] == ["invoice.pdf", "photo.jpg"]
@@ -0,0 +1,78 @@
+import io
+import threading
+from pathlib import Path
+
+from PIL import Image
+
+from admin_automator import runner
+from admin_automator.config import Settings
+from admin_automator.extract import ExtractedFields
+from admin_automator.gmail_client import GmailAttachment, GmailMessage, GmailMessageRef
+
+
+def test_list_newest_merges_allowlist_chunks_by_date(monkeypatch):
+    # chunk 1 has a large backlog of old mail; chunk 2 has the newest messages
+    listed = {
+        "q1": [f"old{i}" for i in range(10)],
+        "q2": ["new0", "new1"],
+    }
+    dates = {f"old{i}": 100 - i for i in range(10)} | {"new0": 500, "new1": 400}
+    fetched: list[str] = []
+
+    def list_messages_with_label(gmail, *, user_id, label_id, max_results, query):
+        return [GmailMessageRef(id=i) for i in listed[query][:max_results]]
+
+    def get_message(gmail, *, user_id, message_id):
+        fetched.append(message_id)
+        return GmailMessage(id=message_id, internal_date_ms=dates[message_id])
+
+    monkeypatch.setattr(runner, "list_messages_with_label", list_messages_with_label)
+    monkeypatch.setattr(runner, "get_message", get_message)
+
+    out = runner._list_newest(None, user_id="me", label_id="L", queries=["q1", "q2"], max_messages=3)
+
+    assert [m.id for m in out] == ["new0", "new1", "old0"]
+    assert len(fetched) <= 3 + 2
+
+
+def test_run_once_converts_attachments_with_concurrent_message_workers(monkeypatch, tmp_path: Path):
+    png = io.BytesIO()
+    Image.new("RGB", (200, 100), "white").save(png, format="PNG")
+    messages = {m: GmailMessage(id=m, sender="billing@example.com", internal_date_ms=i) for i, m in enumerate("ab")}
+    extracted: list[str] = []
+
+    monkeypatch.setattr(runner, "_build_service", lambda *a, **k: object())
+    monkeypatch.setattr(runner, "get_or_create_label", lambda *a, **k: "L")
+    monkeypatch.setattr(runner, "get_or_create_folder", lambda *a, **k: "F")
+    monkeypatch.setattr(
+        runner, "list_messages_with_label", lambda *a, **k: [GmailMessageRef(id=m) for m in messages]
+    )
+    monkeypatch.setattr(runner, "get_message", lambda *a, message_id, **k: messages[message_id])
+    monkeypatch.setattr(
+        runner,
+        "iter_attachments",
+        lambda *a, message, **k: iter([GmailAttachment(f"{message.id}.png", "image/png", png.getvalue())]),
+    )
+    monkeypatch.setattr(runner, "ensure_ocr_dependencies", lambda: None)
+    monkeypatch.setattr(runner, "ocr_pdf", lambda *, in_path, out_path: in_path)
+    monkeypatch.setattr(
+        runner, "extract_fields_from_pdf", lambda path, **k: (extracted.append(Path(path).name), ExtractedFields())[1]
+    )
+
+    settings = Settings.model_validate(
+        {
+            "allowlisted_senders": ["billing@example.com"],
+            "ocr": {"preprocess": False},
+            "processing": {"workdir": str(tmp_path), "message_workers": 2, "convert_workers": 2},
+        }
+    )
+    results: list = []
+    t = threading.Thread(
+        target=lambda: results.extend(runner.run_once(settings=settings, creds=None, dry_run=True)), daemon=True
+    )
+    t.start()
+    t.join(timeout=60)
+
+    assert not t.is_alive(), "run_once deadlocked"
+    assert sorted(r.message_id for r in results if r.processed) == ["a", "b"]
+    assert sorted(extracted) == ["a.png.pdf", "b.png.pdf"]
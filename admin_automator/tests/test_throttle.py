@@ -0,0 +1,44 @@
+import threading
+import time
+
+from admin_automator.throttle import FairSlots, RateLimiter
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    # first is free, the other five wait ~20ms each
+    assert time.monotonic() - start >= 0.08
+
+
+def test_fair_slots_prefer_account_with_fewest_slots():
+    slots = FairSlots(capacity=2)
+    slots.acquire("busy")
+    slots.acquire("busy")
+
+    order: list[str] = []
+
+    def waiter(account: str) -> None:
+        with slots.slot(account):
+            order.append(account)
+            time.sleep(0.05)
+
+    busy = threading.Thread(target=waiter, args=("busy",))
+    busy.start()
+    time.sleep(0.02)
+    quiet = threading.Thread(target=waiter, args=("quiet",))
+    quiet.start()
+    time.sleep(0.02)
+
+    # Free one slot: "busy" still holds one, so "quiet" (holding none) goes first
+    # even though "busy" has been waiting longer.
+    slots.release("busy")
+    time.sleep(0.02)
+    assert order == ["quiet"]
+
+    slots.release("busy")
+    busy.join(1)
+    quiet.join(1)
+    assert order == ["quiet", "busy"]